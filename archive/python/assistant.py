@@ -4,12 +4,17 @@ AssistedVoice - Local AI Voice Assistant
 Main application entry point
 """
 import os
+import re
 import sys
-import yaml
 import logging
+import logging.handlers
 import argparse
 import time
+import queue
+import selectors
+import threading
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 import signal
 from pathlib import Path
 
@@ -20,11 +25,46 @@ from modules.stt import WhisperSTT, PushToTalkSTT
 from modules.llm import OptimizedOllamaLLM
 from modules.tts import create_tts_engine, StreamingTTS
 from modules.ui import TerminalUI, MinimalUI
+from modules.config_helper import load_config_file
+
+# Flush points for streaming TTS
+SENTENCE_END = re.compile(r'[.?!]\s*$')
+CLAUSE_END = re.compile(r',\s*$')
+MAX_TTS_CHUNK_TOKENS = 80
+
+
+def is_sentence_boundary(buffer: str, token_count: int) -> bool:
+    """Check whether buffered response text is ready to hand to TTS"""
+    if SENTENCE_END.search(buffer) or token_count >= MAX_TTS_CHUNK_TOKENS:
+        return True
+    # Long clauses are spoken at the comma rather than waiting for the full stop
+    return bool(CLAUSE_END.search(buffer)) and len(buffer.split()) >= 4
+
+
+def to_pynput_hotkey(hotkey: str) -> str:
+    """Convert a 'ctrl+shift+m' style hotkey to pynput's '<ctrl>+<shift>+m' format"""
+    return '+'.join(
+        key if len(key) == 1 else f"<{key}>"
+        for key in hotkey.lower().split('+')
+    )
 
 
 class VoiceAssistant:
     """Main Voice Assistant Application"""
     
+    # Spoken/typed command -> (method name, *args)
+    _COMMANDS = {
+        "clear history": ("clear_history",),
+        "clear conversation": ("clear_history",),
+        "help": ("show_help",),
+        "quit": ("quit",),
+        "exit": ("quit",),
+        "toggle mode": ("toggle_mode",),
+        "text mode": ("set_mode", "text"),
+        "voice mode": ("set_mode", "voice"),
+    }
+    _MAX_COMMAND_LENGTH = 24  # longest phrase plus room for whitespace/punctuation
+    
     def __init__(self, config_path: str = "config.yaml", mode: Optional[str] = None):
         self.config = self.load_config(config_path)
         
@@ -39,19 +79,32 @@ class VoiceAssistant:
         self.ui = None
         self.stt = None
         self.llm = None
-        self.tts = None
+        self._tts_cache = {}  # (engine, voice) -> TTS engine, built on first use
         self.streaming_tts = None
+        self._hotkey_listener = None
         
         self.running = False
         self.mode = self.config['ui']['mode']
+        self._warmed_up = threading.Event()
+        self._stdin_pending = b''  # bytes read from stdin but not yet returned as lines
         
         self.logger.info("Initializing AssistedVoice...")
         self.setup_components()
     
+    @property
+    def tts(self):
+        """TTS engine for the current settings, created on first use and cached"""
+        tts_config = self.config['tts']
+        key = (tts_config.get('engine', 'macos'), tts_config.get('voice'))
+        engine = self._tts_cache.get(key)
+        if engine is None:
+            self.logger.info("Initializing Text-to-Speech...")
+            engine = self._tts_cache[key] = create_tts_engine(self.config)
+        return engine
+    
     def load_config(self, config_path: str) -> dict:
         """Load configuration from YAML file"""
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
+        return load_config_file(config_path)
     
     def setup_logging(self):
         """Setup logging configuration"""
@@ -59,17 +112,27 @@ class VoiceAssistant:
         log_level = getattr(logging, log_config.get('level', 'INFO'))
         log_file = log_config.get('file', 'logs/assistant.log')
         
-        # Create log directory if needed
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        # Create log directory if needed (a bare filename has none)
+        log_dir = Path(log_file).parent
+        if log_dir != Path('.'):
+            log_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Configure logging; records are written by a background listener
+        # so file I/O never blocks the audio or LLM threads
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handlers = [logging.FileHandler(log_file)]
+        if log_level == logging.DEBUG:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        log_queue = queue.Queue(-1)
+        self.log_listener = logging.handlers.QueueListener(log_queue, *handlers)
+        self.log_listener.start()
         
-        # Configure logging
         logging.basicConfig(
             level=log_level,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler() if log_level == logging.DEBUG else logging.NullHandler()
-            ]
+            handlers=[logging.handlers.QueueHandler(log_queue)]
         )
     
     def setup_components(self):
@@ -81,26 +144,24 @@ class VoiceAssistant:
             else:
                 self.ui = TerminalUI(self.config)
             
-            # Speech Recognition
-            self.logger.info("Initializing Speech Recognition...")
-            if self.config['hotkeys'].get('push_to_talk'):
-                self.stt = PushToTalkSTT(
-                    self.config,
-                    key=self.config['hotkeys']['push_to_talk']
-                )
-            else:
-                self.stt = WhisperSTT(self.config)
-            
-            # Language Model
-            self.logger.info("Initializing Language Model...")
-            self.llm = OptimizedOllamaLLM(self.config)
+            # Per-turn settings, read once
+            self._streaming = bool(self.config['performance'].get('response_streaming'))
+            self._voice_mode = (self.mode == 'voice')
             
-            # Text-to-Speech
-            self.logger.info("Initializing Text-to-Speech...")
-            self.tts = create_tts_engine(self.config)
+            # Model loading for STT, LLM and (in voice mode) TTS is independent; overlap it
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                stt_future = executor.submit(self.build_stt)
+                self.logger.info("Initializing Language Model...")
+                llm_future = executor.submit(OptimizedOllamaLLM, self.config)
+                tts_future = executor.submit(lambda: self.tts) if self._voice_mode else None
+                
+                self.stt = stt_future.result()
+                self.llm = llm_future.result()
+                if tts_future:
+                    tts_future.result()
             
             # Streaming TTS if enabled
-            if self.config['performance'].get('response_streaming') and self.mode == 'voice':
+            if self._streaming and self._voice_mode:
                 self.streaming_tts = StreamingTTS(self.tts)
                 self.streaming_tts.start()
             
@@ -110,10 +171,23 @@ class VoiceAssistant:
             self.logger.error(f"Failed to initialize components: {e}")
             raise
     
+    def build_stt(self):
+        """Create the speech recognizer for the configured input style"""
+        self.logger.info("Initializing Speech Recognition...")
+        if self.config['hotkeys'].get('push_to_talk'):
+            return PushToTalkSTT(
+                self.config,
+                key=self.config['hotkeys']['push_to_talk']
+            )
+        return WhisperSTT(self.config)
+    
     def run(self):
         """Main application loop"""
         self.running = True
         
+        # Warm the models while the banner is on screen
+        threading.Thread(target=self.warm_up, daemon=True).start()
+        
         # Display banner and help
         self.ui.display_banner()
         self.ui.display_help()
@@ -140,6 +214,17 @@ class VoiceAssistant:
         finally:
             self.cleanup()
     
+    def warm_up(self):
+        """Load the voice in voice mode so the first turn skips cold start"""
+        try:
+            # The LLM prewarms itself during setup
+            if self._voice_mode:
+                self.tts.warmup()
+        except Exception as e:
+            self.logger.warning(f"Warmup failed: {e}")
+        finally:
+            self._warmed_up.set()
+    
     def run_vad_mode(self):
         """Run with Voice Activity Detection"""
         self.ui.display_info("Voice Activity Detection mode. Press ENTER to start recording.")
@@ -147,10 +232,7 @@ class VoiceAssistant:
         while self.running:
             try:
                 # Wait for user input
-                # Wait for user input
-                input()
-                
-                if not self.running:
+                if self.read_input() is None:
                     break
                 
                 # Start recording
@@ -177,17 +259,21 @@ class VoiceAssistant:
         while self.running:
             try:
                 # Get user input
-                user_input = input("\nYou: ").strip()
+                user_input = self.read_input("\nYou: ")
+                if user_input is None:
+                    break
+                user_input = user_input.strip()
+                command = user_input.lower()
                 
-                if user_input.lower() in ['quit', 'exit', 'q']:
+                if command in ('quit', 'exit', 'q'):
                     self.quit()
                     break
                     
-                if user_input.lower() in ['clear', 'c']:
+                if command in ('clear', 'c'):
                     self.clear_history()
                     continue
                     
-                if user_input.lower() in ['help', 'h']:
+                if command in ('help', 'h'):
                     self.ui.display_help()
                     continue
                 
@@ -204,6 +290,28 @@ class VoiceAssistant:
                 self.logger.error(f"Error in text mode: {e}")
                 self.ui.display_error(str(e))
     
+    def read_input(self, prompt: str = "") -> Optional[str]:
+        """Read a line from stdin, returning None once the assistant stops or stdin closes"""
+        print(prompt, end="", flush=True)
+        fd = sys.stdin.fileno()
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            # Poll so a quit from the hotkey thread ends the wait promptly
+            while self.running:
+                # Several pasted lines arrive in one read; serve them before waiting again
+                line, newline, rest = self._stdin_pending.partition(b'\n')
+                if newline:
+                    self._stdin_pending = rest
+                    return line.decode(errors='replace')
+                if selector.select(timeout=0.1):
+                    # Unbuffered read, so nothing is left hidden from select()
+                    data = os.read(fd, 4096)
+                    if not data:
+                        line, self._stdin_pending = self._stdin_pending, b''
+                        return line.decode(errors='replace') if line else None
+                    self._stdin_pending += data
+        return None
+    
     def run_push_to_talk_mode(self):
         """Run with Push-to-Talk"""
         key = self.config['hotkeys']['push_to_talk']
@@ -222,6 +330,9 @@ class VoiceAssistant:
     
     def process_input(self, text: str):
         """Process user input"""
+        # Input that arrives before warmup finishes waits for it
+        self._warmed_up.wait()
+        
         # Display user input
         self.ui.display_user_input(text)
         
@@ -232,31 +343,41 @@ class VoiceAssistant:
         # Generate response
         self.ui.update_status("Processing...", "yellow")
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Get response from LLM
-        if self.config['performance'].get('response_streaming'):
+        if self._streaming:
             # Streaming response
-            if self.mode == 'text':
+            if not self._voice_mode:
                 # Text-only mode with streaming display
                 self.ui.display_streaming_response(
                     self.llm.generate(text, stream=True)
                 )
             else:
-                # Voice mode with streaming TTS
-                response_text = ""
+                # Voice mode with streaming TTS, fed one sentence at a time
+                if self.streaming_tts:
+                    # Barge-in: a new turn cuts off whatever is still playing
+                    self.streaming_tts.cancel()
+                parts = []
+                buffer = ""
+                token_count = 0
                 for chunk in self.llm.generate(text, stream=True):
-                    response_text += chunk
-                    if self.streaming_tts:
-                        self.streaming_tts.add_text(chunk)
+                    parts.append(chunk)
+                    buffer += chunk
+                    token_count += 1
+                    if self.streaming_tts and is_sentence_boundary(buffer, token_count):
+                        # Clauses and long runs are spoken as is, not re-buffered to a full stop
+                        self.streaming_tts.speak_chunk(buffer)
+                        buffer = ""
+                        token_count = 0
                 
-                if self.streaming_tts:
-                    self.streaming_tts.flush()
+                if self.streaming_tts and buffer:
+                    self.streaming_tts.speak_chunk(buffer)
                 
                 # Also display in terminal
                 self.ui.display_assistant_response(
-                    response_text,
-                    time.time() - start_time
+                    ''.join(parts),
+                    time.perf_counter() - start_time
                 )
         else:
             # Non-streaming response
@@ -265,11 +386,11 @@ class VoiceAssistant:
             # Display response
             self.ui.display_assistant_response(
                 response,
-                time.time() - start_time
+                time.perf_counter() - start_time
             )
             
             # Speak if in voice mode
-            if self.mode == 'voice':
+            if self._voice_mode:
                 self.ui.update_status("Speaking...", "cyan")
                 self.tts.speak(response)
         
@@ -277,25 +398,18 @@ class VoiceAssistant:
     
     def handle_command(self, text: str) -> bool:
         """Handle special commands"""
-        text_lower = text.lower().strip()
-        
-        commands = {
-            "clear history": self.clear_history,
-            "clear conversation": self.clear_history,
-            "help": self.show_help,
-            "quit": self.quit,
-            "exit": self.quit,
-            "toggle mode": self.toggle_mode,
-            "text mode": lambda: self.set_mode('text'),
-            "voice mode": lambda: self.set_mode('voice'),
-        }
-        
-        for cmd, func in commands.items():
-            if cmd in text_lower:
-                func()
-                return True
-        
-        return False
+        # No command phrase is this long; skip normalizing ordinary chat
+        if len(text) > self._MAX_COMMAND_LENGTH:
+            return False
+        
+        # Whole-utterance match; transcriptions often end with punctuation
+        command = self._COMMANDS.get(text.lower().strip().rstrip('.!?'))
+        if command is None:
+            return False
+        
+        method_name, *args = command
+        getattr(self, method_name)(*args)
+        return True
     
     def setup_keyboard_handlers(self):
         """Setup keyboard shortcuts"""
@@ -305,38 +419,41 @@ class VoiceAssistant:
             return
             
         try:
-            import keyboard
+            from pynput.keyboard import GlobalHotKeys
             hotkeys = self.config.get('hotkeys', {})
+            actions = {
+                'toggle_mode': self.toggle_mode,
+                'clear_history': self.clear_history,
+                'exit': self.quit,
+            }
+            mapping = {
+                to_pynput_hotkey(hotkeys[name]): callback
+                for name, callback in actions.items() if hotkeys.get(name)
+            }
             
-            if hotkeys.get('toggle_mode'):
-                keyboard.add_hotkey(hotkeys['toggle_mode'], self.toggle_mode)
-            
-            if hotkeys.get('clear_history'):
-                keyboard.add_hotkey(hotkeys['clear_history'], self.clear_history)
-            
-            if hotkeys.get('exit'):
-                keyboard.add_hotkey(hotkeys['exit'], self.quit)
+            # One listener thread serves every hotkey
+            if mapping:
+                self._hotkey_listener = GlobalHotKeys(mapping)
+                self._hotkey_listener.start()
         except ImportError:
-            self.logger.warning("Keyboard module not available - hotkeys disabled")
+            self.logger.warning("pynput not available - hotkeys disabled")
         except Exception as e:
             self.logger.warning(f"Could not set up keyboard shortcuts: {e}")
     
     def toggle_mode(self):
         """Toggle between text and voice mode"""
         self.mode = 'voice' if self.mode == 'text' else 'text'
+        self._voice_mode = (self.mode == 'voice')
         self.config['ui']['mode'] = self.mode
         
-        # Update TTS
-        self.tts = create_tts_engine(self.config)
-        
         self.ui.display_info(f"Switched to {self.mode} mode")
         self.logger.info(f"Mode switched to: {self.mode}")
     
     def set_mode(self, mode: str):
         """Set specific mode"""
         self.mode = mode
+        self._voice_mode = (mode == 'voice')
         self.config['ui']['mode'] = mode
-        self.tts = create_tts_engine(self.config)
         self.ui.display_info(f"Mode set to: {mode}")
     
     def clear_history(self):
@@ -361,10 +478,14 @@ class VoiceAssistant:
         if self.streaming_tts:
             self.streaming_tts.stop()
         
-        if self.tts:
-            self.tts.stop()
+        if self._hotkey_listener:
+            self._hotkey_listener.stop()
+        
+        for engine in self._tts_cache.values():
+            engine.stop()
         
         self.logger.info("Cleanup complete")
+        self.log_listener.stop()
 
 
 def main():
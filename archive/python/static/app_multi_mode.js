@@ -5,6 +5,7 @@
 
 // Global variables
 let socket = null;
+let audioSocket = null;
 let mediaRecorder = null;
 let audioStream = null;
 let audioContext = null;
@@ -307,25 +308,22 @@ async function startContinuousMode() {
         // Send chunks immediately for continuous processing
         mediaRecorder.ondataavailable = (event) => {
             if (event.data.size > 0 && isActive) {
-                const reader = new FileReader();
-                reader.onloadend = () => {
-                    socket.emit('audio_stream_continuous', {
-                        audio: reader.result,
-                        timestamp: Date.now(),
-                        settings: settings.continuous
-                    });
-                };
-                reader.readAsDataURL(event.data);
+                // Send raw bytes over the audio WebSocket
+                audioSocket.send(event.data);
             }
         };
         
+        // Audio socket must be open before the first chunk (it carries the WebM header)
+        audioSocket = await openAudioSocket();
+        
+        // Notify server and wait for its acknowledgement: the first chunk carries
+        // the WebM header, so it must not arrive before the server's decoder exists
+        await new Promise(resolve => socket.emit('start_continuous_mode', { settings: settings.continuous }, resolve));
+        
         // Start recording with larger chunks for better WebM containers
         mediaRecorder.start(250); // 250ms chunks for better audio quality
         isActive = true;
         
-        // Notify server
-        socket.emit('start_continuous_mode', { settings: settings.continuous });
-        
         // Update UI
         updateUIForActiveStreaming();
         updateStatus('Streaming... Speak naturally', 'listening');
@@ -372,25 +370,22 @@ async function startSmartMode() {
         // Buffer chunks for smart pause detection
         mediaRecorder.ondataavailable = (event) => {
             if (event.data.size > 0 && isActive) {
-                const reader = new FileReader();
-                reader.onloadend = () => {
-                    socket.emit('audio_stream_smart', {
-                        audio: reader.result,
-                        timestamp: Date.now(),
-                        settings: settings.smart
-                    });
-                };
-                reader.readAsDataURL(event.data);
+                // Send raw bytes over the audio WebSocket
+                audioSocket.send(event.data);
             }
         };
         
+        // Audio socket must be open before the first chunk (it carries the WebM header)
+        audioSocket = await openAudioSocket();
+        
+        // Notify server and wait for its acknowledgement: the first chunk carries
+        // the WebM header, so it must not arrive before the server's decoder exists
+        await new Promise(resolve => socket.emit('start_smart_mode', { settings: settings.smart }, resolve));
+        
         // Start recording with larger chunks for reliable detection
         mediaRecorder.start(500); // 500ms chunks for better pause detection
         isActive = true;
         
-        // Notify server
-        socket.emit('start_smart_mode', { settings: settings.smart });
-        
         // Update UI
         updateUIForActiveStreaming();
         updateStatus('Listening for speech...', 'listening');
@@ -404,6 +399,18 @@ async function startSmartMode() {
     }
 }
 
+/**
+ * Open the raw WebSocket that carries streaming audio chunks
+ */
+function openAudioSocket() {
+    const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+    const ws = new WebSocket(`${scheme}://${location.host}/audio?sid=${socket.id}`);
+    return new Promise((resolve, reject) => {
+        ws.onopen = () => resolve(ws);
+        ws.onerror = () => reject(new Error('Audio connection failed'));
+    });
+}
+
 /**
  * Stop streaming modes (continuous/smart)
  */
@@ -420,6 +427,11 @@ function stopStreamingMode() {
     isActive = false;
     clearTimeout(silenceTimer);
     
+    if (audioSocket) {
+        audioSocket.close();
+        audioSocket = null;
+    }
+    
     // Notify server
     if (currentMode === 'continuous') {
         socket.emit('stop_continuous_mode');
@@ -501,11 +513,7 @@ function stopRecording() {
  * Send audio to server (PTT mode)
  */
 async function sendAudioToServer(audioBlob) {
-    const reader = new FileReader();
-    reader.onloadend = () => {
-        socket.emit('process_audio', { audio: reader.result });
-    };
-    reader.readAsDataURL(audioBlob);
+    socket.emit('process_audio', await audioBlob.arrayBuffer());
 }
 
 /**
@@ -3,11 +3,10 @@
 Web-based AssistedVoice with Push-to-Talk Button
 Flask backend with WebSocket support
 """
-import os
 import sys
 import yaml
 import base64
-import tempfile
+import subprocess
 from pathlib import Path
 from flask import Flask, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
@@ -20,6 +19,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from modules.stt import WhisperSTT
 from modules.llm import OllamaLLM
 from modules.tts import create_tts_engine
+from modules.pipeline import process_audio_bytes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -76,6 +76,18 @@ def get_config():
         'tts_voice': config['tts'].get('voice', 'default')
     })
 
+def speak_in_background(text, sid):
+    """Speak with macOS 'say' without blocking the socket handler"""
+    voice = config['tts'].get('voice', 'Samantha')
+    process = subprocess.Popen(['say', '-v', voice, text])
+    
+    def wait_for_speech():
+        process.wait()
+        socketio.emit('tts_complete', {}, room=sid)
+        socketio.emit('status', {'message': 'Ready', 'type': 'ready'}, room=sid)
+    
+    socketio.start_background_task(wait_for_speech)
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
@@ -87,63 +99,40 @@ def handle_disconnect():
     """Handle client disconnection"""
     logger.info(f"Client disconnected: {request.sid}")
 
+def stream_response(text):
+    """Stream the LLM response for text to the client and speak it"""
+    response_text = ""
+    for chunk in llm.generate(text, stream=True):
+        response_text += chunk
+        emit('response_chunk', {'text': chunk})
+    
+    # Complete response
+    emit('response_complete', {'text': response_text})
+    
+    # Generate TTS if enabled
+    if config['tts']['engine'] != 'none':
+        emit('status', {'message': 'Speaking...', 'type': 'speaking'})
+        
+        # For macOS, we'll use the say command
+        if config['tts']['engine'] == 'macos':
+            speak_in_background(response_text, request.sid)
+            return
+    
+    emit('status', {'message': 'Ready', 'type': 'ready'})
+
 @socketio.on('process_audio')
 def handle_audio(data):
     """Process audio from client"""
     try:
-        # Emit status
-        emit('status', {'message': 'Processing audio...', 'type': 'processing'})
-        
         # Decode base64 audio
         audio_data = base64.b64decode(data['audio'].split(',')[1] if ',' in data['audio'] else data['audio'])
         
-        # Save to temporary file as webm (browser sends webm, not wav)
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as tmp_file:
-            tmp_file.write(audio_data)
-            tmp_path = tmp_file.name
-        
-        # Transcribe directly from the webm file
-        # Whisper can handle webm format
-        emit('status', {'message': 'Transcribing...', 'type': 'transcribing'})
+        def respond(transcription):
+            emit('status', {'message': 'Generating response...', 'type': 'generating'})
+            stream_response(transcription)
         
-        # Load and transcribe the audio file
-        # faster-whisper can transcribe directly from file
-        segments, info = stt.model.transcribe(tmp_path, language=config['whisper']['language'])
-        transcription = " ".join([segment.text for segment in segments]).strip()
-        
-        if not transcription:
-            emit('error', {'message': 'No speech detected'})
-            os.unlink(tmp_path)
-            return
-        
-        # Emit transcription
-        emit('transcription', {'text': transcription})
-        
-        # Generate response
-        emit('status', {'message': 'Generating response...', 'type': 'generating'})
-        
-        response_text = ""
-        for chunk in llm.generate(transcription, stream=True):
-            response_text += chunk
-            emit('response_chunk', {'text': chunk})
-        
-        # Complete response
-        emit('response_complete', {'text': response_text})
-        
-        # Generate TTS if enabled
-        if config['tts']['engine'] != 'none':
-            emit('status', {'message': 'Generating speech...', 'type': 'speaking'})
-            
-            # For macOS, we'll use the say command
-            if config['tts']['engine'] == 'macos':
-                import subprocess
-                voice = config['tts'].get('voice', 'Samantha')
-                subprocess.run(['say', '-v', voice, response_text])
-                emit('tts_complete', {})
-        
-        # Clean up
-        os.unlink(tmp_path)
-        emit('status', {'message': 'Ready', 'type': 'ready'})
+        process_audio_bytes(audio_data, emit, stt.model.transcribe, respond,
+                            config['whisper']['language'])
         
     except Exception as e:
         logger.error(f"Error processing audio: {e}")
@@ -161,26 +150,7 @@ def handle_text(data):
         # Emit status
         emit('status', {'message': 'Processing...', 'type': 'generating'})
         
-        # Generate response
-        response_text = ""
-        for chunk in llm.generate(text, stream=True):
-            response_text += chunk
-            emit('response_chunk', {'text': chunk})
-        
-        # Complete response
-        emit('response_complete', {'text': response_text})
-        
-        # Generate TTS if enabled
-        if config['tts']['engine'] != 'none':
-            emit('status', {'message': 'Speaking...', 'type': 'speaking'})
-            
-            if config['tts']['engine'] == 'macos':
-                import subprocess
-                voice = config['tts'].get('voice', 'Samantha')
-                subprocess.run(['say', '-v', voice, response_text])
-                emit('tts_complete', {})
-        
-        emit('status', {'message': 'Ready', 'type': 'ready'})
+        stream_response(text)
         
     except Exception as e:
         logger.error(f"Error processing text: {e}")
@@ -4,18 +4,21 @@ AssistedVoice Streaming Backend with Multiple Modes
 Supports: Continuous, Smart Pause, and Push-to-Talk
 """
 import os
+import re
 import sys
 import yaml
-import base64
-import tempfile
+import subprocess
 import time
+import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
+import simple_websocket
 import logging
-from collections import deque
+import numpy as np
 import webrtcvad
 
 # Add modules to path
@@ -24,6 +27,22 @@ sys.path.insert(0, str(Path(__file__).parent))
 from modules.stt import WhisperSTT
 from modules.llm import OllamaLLM
 from modules.tts import create_tts_engine
+from modules.pipeline import (
+    SAMPLE_RATE, FFMPEG_PCM_OUTPUT, REALTIME_DECODE_OPTIONS,
+    agreed_prefix, pcm16_to_float32, process_audio_bytes
+)
+
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+try:
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:  # faster-whisper < 1.1
+    BatchedInferencePipeline = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,44 +52,270 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+
+class OrjsonSerializer:
+    """json-module stand-in for Socket.IO packets backed by orjson"""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def loads(data, **kwargs):
+        return orjson.loads(data)
+
+
+if orjson:
+    socketio = SocketIO(app, cors_allowed_origins="*", json=OrjsonSerializer)
+else:
+    socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Status payloads reused on every emit
+STATUS_READY = {'message': 'Ready', 'type': 'ready'}
+STATUS_GENERATING = {'message': 'Generating response...', 'type': 'generating'}
+STATUS_SPEAKING = {'message': 'Speaking...', 'type': 'speaking'}
 
 # Global components
 stt = None
 llm = None
 tts = None
 config = None
-vad = None
+transcriber = None
+
+# Single long-lived thread that owns the speaker (macOS TTS only)
+speech_pool = None
+
+# Settings read on hot paths, bound once in initialize_components
+TTS_ENGINE = None
+TTS_VOICE = None
+WHISPER_LANG = None
+
+
+class WebmStreamDecoder:
+    """Persistent ffmpeg process turning a live WebM stream into PCM
+
+    MediaRecorder chunks are fragments of a single WebM stream (only the
+    first one carries the header), so they are piped into one long-lived
+    decoder instead of being re-decoded from disk on every tick.
+    """
+
+    def __init__(self, on_pcm):
+        self.on_pcm = on_pcm
+        self.process = subprocess.Popen(
+            ['ffmpeg', '-loglevel', 'quiet', '-fflags', 'nobuffer',
+             '-f', 'matroska', '-probesize', '32', '-analyzeduration', '0',
+             '-i', 'pipe:0', *FFMPEG_PCM_OUTPUT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self.reader = threading.Thread(target=self._read_pcm)
+        self.reader.daemon = True
+        self.reader.start()
+
+    def _read_pcm(self):
+        """Forward decoded PCM to the session as soon as ffmpeg emits it"""
+        while True:
+            pcm = self.process.stdout.read1(4096)
+            if not pcm:
+                break
+            self.on_pcm(pcm)
+
+    def feed(self, audio_data):
+        """Push the next WebM fragment into the decoder"""
+        self.process.stdin.write(audio_data)
+        self.process.stdin.flush()
+
+    def close(self):
+        """Stop the decoder process"""
+        try:
+            self.process.stdin.close()
+        except Exception:
+            pass
+        self.process.terminate()
+
+
+class TranscriptionPool:
+    """Run transcription requests from every session on a bounded pool
+
+    Each request goes to the pool on its own, so concurrent sessions use
+    all ``workers`` model workers instead of contending for the model from
+    handler threads. Inputs longer than one Whisper window go through
+    BatchedInferencePipeline (when available), which batches their 30 s
+    chunks in a single forward pass.
+    """
+
+    def __init__(self, model, batch_size=8, workers=1):
+        self.model = model
+        self.pipeline = BatchedInferencePipeline(model=model) if BatchedInferencePipeline else None
+        self.batch_size = batch_size
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcribe')
+
+    def transcribe(self, audio, **kwargs):
+        """Transcribe audio on a pool thread and wait for (segments, info)"""
+        return self.pool.submit(self._transcribe, audio, kwargs).result()
+
+    def _transcribe(self, audio, kwargs):
+        """Transcribe one request on a pool thread"""
+        if self.pipeline and kwargs.get('vad_filter') and len(audio) > 30 * SAMPLE_RATE:
+            segments, info = self.pipeline.transcribe(audio, batch_size=self.batch_size, **kwargs)
+        else:
+            segments, info = self.model.transcribe(audio, **kwargs)
+        # Segments are lazy; decode them here rather than on the caller's thread
+        return list(segments), info
+
+
+# Voice activity detection on the decoded PCM stream
+VAD_AGGRESSIVENESS = 2
+VAD_FRAME_MS = 30  # webrtcvad accepts 10, 20 or 30 ms frames
+VAD_FRAME_BYTES = SAMPLE_RATE * VAD_FRAME_MS // 1000 * 2
+END_OF_UTTERANCE_SILENCE_MS = 700  # Trailing silence that ends an utterance
+
 
 # Session management
+# Capacity of a session's PCM buffer; older unconfirmed audio is dropped beyond this
+PCM_BUFFER_SECONDS = 60
+
+
 class StreamingSession:
+    __slots__ = (
+        'sid', 'mode', 'confirmed_text', 'pending_words',
+        'confirmed_offset', 'last_processed_sample', 'is_speaking',
+        'pause_duration', 'current_audio_file', 'processing_lock', 'continuous_transcriber', 'response_in_progress', 'decoder', 'pcm_lock',
+        'pcm', 'pcm_len', 'vad', 'vad_remainder', 'heard_speech',
+        'trailing_silence_ms', 'utterance_ended', 'utterance_text',
+    )
+
     def __init__(self, sid, mode='ptt'):
         self.sid = sid
         self.mode = mode
-        self.audio_buffer = deque(maxlen=200)  # Store more chunks for better processing
-        self.transcription_buffer = ""
-        self.last_speech_time = time.time()
+        self.confirmed_text = ""  # Transcript agreed on by consecutive passes
+        self.pending_words = []  # Unconfirmed words from the previous pass
+        self.confirmed_offset = 0  # Samples already committed to confirmed_text
+        self.last_processed_sample = 0  # Stream position already checked for new speech
         self.is_speaking = False
+        self.pause_duration = 1.5
         self.current_audio_file = None
         self.processing_lock = threading.Lock()
         self.continuous_transcriber = None
         self.response_in_progress = False
-        self.accumulated_audio = b''  # For accumulating complete WebM data
-        
+        self.decoder = None
+        self.pcm_lock = threading.Lock()
+        self.pcm = np.empty(SAMPLE_RATE * PCM_BUFFER_SECONDS, dtype=np.float32)  # Decoded stream audio
+        self.pcm_len = 0  # Valid samples at the start of self.pcm
+        self.vad = webrtcvad.Vad(VAD_AGGRESSIVENESS)
+        self.vad_remainder = bytearray()  # Partial VAD frame carried between decoder reads
+        self.heard_speech = False
+        self.trailing_silence_ms = 0
+        self.utterance_ended = threading.Event()
+        self.utterance_text = ""  # Confirmed text since the last response
+
+    def start_decoder(self):
+        """Start a fresh WebM -> PCM decoder for a new stream"""
+        self.stop_decoder()
+        self.reset_audio()
+        self.decoder = WebmStreamDecoder(self.append_pcm)
+
+    def stop_decoder(self):
+        """Shut down the stream decoder if one is running"""
+        if self.decoder:
+            self.decoder.close()
+            self.decoder = None
+
+    def append_pcm(self, pcm):
+        """Append decoded PCM bytes (called from the decoder thread)"""
+        samples = pcm16_to_float32(pcm)[-len(self.pcm):]
+        with self.pcm_lock:
+            overflow = self.pcm_len + len(samples) - len(self.pcm)
+            if overflow > 0:
+                # Buffer full: drop the oldest audio as if it had been consumed
+                self._drop_samples(overflow)
+                self.confirmed_offset += overflow
+            self.pcm[self.pcm_len:self.pcm_len + len(samples)] = samples
+            self.pcm_len += len(samples)
+        self.detect_end_of_utterance(pcm)
+
+    def detect_end_of_utterance(self, pcm):
+        """Run VAD over new PCM and flag when speech is followed by enough silence"""
+        self.vad_remainder.extend(pcm)
+        frames = len(self.vad_remainder) // VAD_FRAME_BYTES
+        for i in range(frames):
+            frame = bytes(self.vad_remainder[i * VAD_FRAME_BYTES:(i + 1) * VAD_FRAME_BYTES])
+            if self.vad.is_speech(frame, SAMPLE_RATE):
+                self.heard_speech = True
+                self.trailing_silence_ms = 0
+            elif self.heard_speech:
+                self.trailing_silence_ms += VAD_FRAME_MS
+                if self.trailing_silence_ms >= END_OF_UTTERANCE_SILENCE_MS:
+                    self.heard_speech = False
+                    self.utterance_ended.set()
+        del self.vad_remainder[:frames * VAD_FRAME_BYTES]
+
+    def get_audio(self, seconds=None):
+        """Get buffered audio as float32, optionally only the last N seconds"""
+        with self.pcm_lock:
+            start = 0
+            if seconds is not None:
+                start = max(0, self.pcm_len - int(seconds * SAMPLE_RATE))
+            # Copy only the requested window so the decoder thread can keep appending
+            return self.pcm[start:self.pcm_len].copy()
+
+    def stream_position(self):
+        """Total samples decoded so far in this stream"""
+        with self.pcm_lock:
+            return self.confirmed_offset + self.pcm_len
+
+    def consume_audio(self, samples):
+        """Drop the first N samples once their words have been confirmed"""
+        with self.pcm_lock:
+            self._drop_samples(samples)
+            self.confirmed_offset += samples
+
+    def _drop_samples(self, samples):
+        """Shift the buffer left by N samples (caller holds pcm_lock)"""
+        samples = min(samples, self.pcm_len)
+        remaining = self.pcm_len - samples
+        self.pcm[:remaining] = self.pcm[samples:self.pcm_len]
+        self.pcm_len = remaining
+
+    def reset_audio(self):
+        """Drop all buffered PCM"""
+        with self.pcm_lock:
+            self.pcm_len = 0
+
+    def reset_transcript(self):
+        """Forget confirmed and pending transcript state"""
+        self.confirmed_text = ""
+        self.pending_words = []
+        self.confirmed_offset = 0
+        self.last_processed_sample = 0
+        self.utterance_text = ""
+        self.utterance_ended.clear()
+        self.vad_remainder.clear()
+        self.heard_speech = False
+        self.trailing_silence_ms = 0
+
 sessions = {}
 
 def initialize_components():
     """Initialize AI components"""
-    global stt, llm, tts, config, vad
+    global stt, llm, tts, config, transcriber, speech_pool, TTS_ENGINE, TTS_VOICE, WHISPER_LANG
     
     # Load configuration
     with open('config.yaml', 'r') as f:
         config = yaml.safe_load(f)
     
+    TTS_ENGINE = config['tts']['engine']
+    TTS_VOICE = config['tts'].get('voice', 'Samantha')
+    WHISPER_LANG = config['whisper']['language']
+    
     logger.info("Initializing components...")
     
     # Initialize STT
     stt = WhisperSTT(config)
+    # One pool thread per CTranslate2 worker so decodes can run side by side
+    transcriber = TranscriptionPool(stt.model, workers=config['whisper'].get('num_workers', 1))
     logger.info("✓ Speech-to-Text initialized")
     
     # Initialize LLM
@@ -79,12 +324,10 @@ def initialize_components():
     
     # Initialize TTS
     tts = create_tts_engine(config)
+    if TTS_ENGINE == 'macos':
+        speech_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='say')
     logger.info("✓ Text-to-Speech initialized")
     
-    # Initialize VAD for smart pause detection
-    vad = webrtcvad.Vad(2)  # Aggressiveness level 2
-    logger.info("✓ Voice Activity Detection initialized")
-    
     return True
 
 @app.route('/')
@@ -102,6 +345,43 @@ def get_config():
         'tts_voice': config['tts'].get('voice', 'default')
     })
 
+@app.route('/audio')
+def audio_socket():
+    """Raw WebSocket carrying streaming-mode audio chunks for a Socket.IO session
+
+    Audio frames skip Engine.IO framing and event dispatch; control and UI
+    events stay on Socket.IO. The client connects with ?sid=<socket id>.
+    """
+    ws = simple_websocket.Server(request.environ)
+    sid = request.args.get('sid')
+    try:
+        while True:
+            audio_data = ws.receive()
+            session = sessions.get(sid)
+            if not session:
+                break
+            if session.mode == 'continuous':
+                ingest_continuous_audio(session, audio_data)
+            elif session.mode == 'smart':
+                ingest_smart_audio(session, audio_data)
+    except simple_websocket.ConnectionClosed:
+        pass
+    try:
+        ws.close()
+    except Exception:
+        pass
+    
+    class WebSocketResponse(Response):
+        def __call__(self, *args, **kwargs):
+            # The socket is already closed; keep the server from writing an HTTP response
+            if ws.mode == 'werkzeug':
+                raise ConnectionError()
+            if ws.mode == 'gunicorn':
+                raise StopIteration()
+            return []
+    
+    return WebSocketResponse()
+
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
@@ -116,6 +396,7 @@ def handle_disconnect():
     if request.sid in sessions:
         session = sessions[request.sid]
         # Clean up any resources
+        session.stop_decoder()
         if session.current_audio_file and os.path.exists(session.current_audio_file):
             os.unlink(session.current_audio_file)
         del sessions[request.sid]
@@ -128,10 +409,10 @@ def handle_start_continuous(data):
     if not session:
         return
     
+    # The decoder must exist before the mode lets audio through to it
+    session.reset_transcript()
+    session.start_decoder()
     session.mode = 'continuous'
-    session.audio_buffer.clear()
-    session.transcription_buffer = ""
-    session.accumulated_audio = b''  # Reset accumulated audio
     
     logger.info(f"Started continuous mode for {request.sid}")
     emit('status', {'message': 'Continuous mode active', 'type': 'listening'})
@@ -143,26 +424,15 @@ def handle_start_continuous(data):
     )
     session.continuous_transcriber.daemon = True
     session.continuous_transcriber.start()
-
-@socketio.on('audio_stream_continuous')
-def handle_continuous_audio(data):
-    """Handle continuous audio streaming"""
-    session = sessions.get(request.sid)
-    if not session or session.mode != 'continuous':
-        return
     
+    # Acknowledge, so the client only starts recording once audio will be accepted
+    return True
+
+def ingest_continuous_audio(session, audio_data):
+    """Handle a continuous-mode audio chunk (raw WebM bytes)"""
     try:
-        # Decode audio chunk
-        audio_data = base64.b64decode(data['audio'].split(',')[1] if ',' in data['audio'] else data['audio'])
-        
-        # Accumulate complete audio data
-        session.accumulated_audio += audio_data
-        
-        # Add to buffer for processing
-        session.audio_buffer.append({
-            'data': audio_data,
-            'timestamp': data.get('timestamp', time.time())
-        })
+        # Stream into the PCM decoder
+        session.decoder.feed(audio_data)
         
         # Don't process immediately - let the worker thread handle it
         # This avoids processing incomplete audio chunks
@@ -170,85 +440,100 @@ def handle_continuous_audio(data):
     except Exception as e:
         logger.error(f"Error in continuous audio: {e}")
 
+# Conservative Silero VAD settings so pauses inside a sentence are not cut
+SPEECH_VAD_OPTIONS = VadOptions(threshold=0.35, min_silence_duration_ms=500, speech_pad_ms=200)
+
+# Unconfirmed audio is force-committed past this length to bound each pass
+MAX_UNCONFIRMED_SECONDS = 15.0
+# RMS below which newly arrived audio is treated as silence
+SILENCE_RMS = 0.005
+
+
 def process_continuous_audio(session):
-    """Process audio for continuous mode"""
+    """Process audio for continuous mode
+
+    Only the audio after the last confirmed word is transcribed. Words are
+    confirmed once two consecutive passes agree on them, after which their
+    audio is dropped from the buffer so the next pass stays short.
+    """
     with session.processing_lock:
         try:
-            # Need at least 20 chunks (2 seconds) for meaningful transcription
-            if len(session.audio_buffer) < 20:
+            # Need at least 2 seconds of decoded stream for meaningful transcription
+            if session.stream_position() < SAMPLE_RATE * 2:
                 return
             
-            # Combine recent audio chunks
-            recent_chunks = list(session.audio_buffer)[-30:]  # Last 3 seconds
-            if not recent_chunks:
+            # VAD saw the speaker stop: commit everything heard so far and respond
+            end_of_utterance = session.utterance_ended.is_set()
+            
+            # Nothing decoded since the last tick: skip without copying the buffer
+            if not end_of_utterance and session.stream_position() == session.last_processed_sample:
                 return
-                
-            combined_audio = b''.join([chunk['data'] for chunk in recent_chunks])
+            session.utterance_ended.clear()
+            
+            # Decoded PCM not yet committed to the transcript
+            audio = session.get_audio()
             
-            # Skip if audio is too small (likely invalid)
-            if len(combined_audio) < 5000:  # Need more data for WebM
+            # Skip Whisper entirely when nothing audible arrived since the last tick
+            new_audio = audio[max(0, session.last_processed_sample - session.confirmed_offset):]
+            session.last_processed_sample = session.confirmed_offset + len(audio)
+            if not end_of_utterance and (
+                    len(new_audio) == 0 or np.sqrt(np.mean(new_audio ** 2)) < SILENCE_RMS):
                 return
             
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as tmp_file:
-                tmp_file.write(combined_audio)
-                tmp_path = tmp_file.name
+            words = []
+            if len(audio) >= SAMPLE_RATE // 2:
+                try:
+                    # Conservative VAD drops silence without cutting pauses mid-sentence
+                    segments, info = transcriber.transcribe(
+                        audio,
+                        language=WHISPER_LANG,
+                        vad_filter=True,  # Timestamps are mapped back onto the unfiltered audio
+                        vad_parameters=SPEECH_VAD_OPTIONS,
+                        word_timestamps=True,  # Needed to advance past confirmed words
+                        initial_prompt=session.confirmed_text[-200:] or "This is a conversation. ",
+                        **REALTIME_DECODE_OPTIONS
+                    )
+                    
+                    words = [word for segment in segments for word in (segment.words or [])]
+                except Exception as e:
+                    logger.debug(f"Transcription error (expected for small chunks): {e}")
             
-            try:
-                # Transcribe WITHOUT VAD filter for continuous mode
-                segments, info = stt.model.transcribe(
-                    tmp_path, 
-                    language=config['whisper']['language'],
-                    vad_filter=False,  # Don't filter in continuous mode
-                    beam_size=1,  # Faster for real-time
-                    without_timestamps=True,  # Faster processing
-                    initial_prompt="This is a conversation. "  # Help with context
-                )
-                
-                transcription = " ".join([segment.text for segment in segments]).strip()
-            except Exception as e:
-                logger.debug(f"Transcription error (expected for small chunks): {e}")
-                transcription = ""
-            finally:
-                # Clean up
-                if os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+            # Confirm words both passes agree on; force-commit at the end of an
+            # utterance or if the buffer grew too long
+            if end_of_utterance or len(audio) > MAX_UNCONFIRMED_SECONDS * SAMPLE_RATE:
+                confirmed_count = len(words)
+            else:
+                confirmed_count = agreed_prefix(session.pending_words, words)
             
-            if transcription and transcription != session.transcription_buffer:
-                # New transcription detected
-                new_text = transcription[len(session.transcription_buffer):] if session.transcription_buffer else transcription
+            confirmed = words[:confirmed_count]
+            session.pending_words = words[confirmed_count:]
+            
+            if confirmed:
+                new_text = "".join(word.word for word in confirmed).strip()
+                session.confirmed_text = f"{session.confirmed_text} {new_text}".strip()
+                session.utterance_text = f"{session.utterance_text} {new_text}".strip()
+                session.consume_audio(min(len(audio), int(confirmed[-1].end * SAMPLE_RATE)))
                 
-                if new_text.strip():
-                    # Send partial transcription
+                if new_text:
+                    # Send confirmed transcript along with the newly confirmed delta
                     socketio.emit('partial_transcription', 
-                                {'text': transcription}, 
+                                {'text': session.confirmed_text, 'delta': new_text}, 
                                 room=session.sid)
-                    
-                    # Check if we have a complete phrase to respond to
-                    if should_generate_response(new_text):
-                        generate_streaming_response(session, new_text)
-                    
-                    session.transcription_buffer = transcription
+            
+            # Respond once the speaker has paused
+            if end_of_utterance and session.utterance_text:
+                utterance = session.utterance_text
+                session.utterance_text = ""
+                generate_streaming_response(session, utterance)
                     
         except Exception as e:
             logger.error(f"Error processing continuous audio: {e}")
 
-def should_generate_response(text):
-    """Determine if text warrants a response"""
-    # Simple heuristic: respond to questions or complete sentences
-    text = text.strip().lower()
-    return (
-        '?' in text or
-        text.endswith('.') or
-        len(text.split()) > 5 or
-        any(q in text for q in ['what', 'how', 'why', 'when', 'where', 'who'])
-    )
-
 def continuous_transcription_worker(session):
     """Background worker for continuous transcription"""
     while session.mode == 'continuous':
         time.sleep(1.0)  # Process every second for better audio chunks
-        if len(session.audio_buffer) >= 20:  # Need enough data
+        if session.stream_position() >= SAMPLE_RATE * 2:  # Need enough decoded audio
             process_continuous_audio(session)
 
 @socketio.on('stop_continuous_mode')
@@ -257,7 +542,7 @@ def handle_stop_continuous(data=None):
     session = sessions.get(request.sid)
     if session:
         session.mode = 'ptt'
-        session.audio_buffer.clear()
+        session.stop_decoder()
         logger.info(f"Stopped continuous mode for {request.sid}")
 
 # === SMART PAUSE MODE ===
@@ -268,95 +553,64 @@ def handle_start_smart(data):
     if not session:
         return
     
-    session.mode = 'smart'
-    session.audio_buffer.clear()
-    session.transcription_buffer = ""
-    session.last_speech_time = time.time()
-    session.accumulated_audio = b''  # Reset accumulated audio
+    # The decoder must exist before the mode lets audio through to it
+    session.reset_transcript()
+    session.start_decoder()
     
     settings = data.get('settings', {})
     session.pause_duration = settings.get('pauseDuration', 1500) / 1000.0
+    session.mode = 'smart'
     
     logger.info(f"Started smart mode for {request.sid}")
     emit('status', {'message': 'Smart pause mode active', 'type': 'listening'})
-
-@socketio.on('audio_stream_smart')
-def handle_smart_audio(data):
-    """Handle smart pause audio streaming"""
-    session = sessions.get(request.sid)
-    if not session or session.mode != 'smart':
-        return
     
+    # Acknowledge, so the client only starts recording once audio will be accepted
+    return True
+
+def ingest_smart_audio(session, audio_data):
+    """Handle a smart-pause audio chunk (raw WebM bytes)"""
     try:
-        # Decode audio chunk
-        audio_data = base64.b64decode(data['audio'].split(',')[1] if ',' in data['audio'] else data['audio'])
-        
-        # Accumulate audio
-        session.accumulated_audio += audio_data
-        
-        # Add to buffer
-        session.audio_buffer.append({
-            'data': audio_data,
-            'timestamp': data.get('timestamp', time.time())
-        })
+        # Stream into the PCM decoder
+        session.decoder.feed(audio_data)
         
-        # Simple speech detection based on audio size and activity
-        is_speech = len(audio_data) > 500  # Simplified detection
+        # Run Silero VAD over the recent tail of the decoded stream
+        window = session.get_audio(seconds=session.pause_duration + 1.0)
+        speech = get_speech_timestamps(window, SPEECH_VAD_OPTIONS)
+        silence_duration = (len(window) - speech[-1]['end']) / SAMPLE_RATE if speech else None
         
-        if is_speech:
-            session.last_speech_time = time.time()
-            if not session.is_speaking:
-                session.is_speaking = True
-                socketio.emit('vad_speech_start', room=session.sid)
-        else:
-            # Check for pause
-            silence_duration = time.time() - session.last_speech_time
-            
-            if session.is_speaking and silence_duration > session.pause_duration:
-                # Pause detected, process buffered audio
-                session.is_speaking = False
-                socketio.emit('vad_speech_end', room=session.sid)
-                process_smart_pause_audio(session)
+        if speech and not session.is_speaking:
+            session.is_speaking = True
+            socketio.emit('vad_speech_start', room=session.sid)
+        elif session.is_speaking and (silence_duration is None or silence_duration > session.pause_duration):
+            # Pause detected, process buffered audio
+            session.is_speaking = False
+            socketio.emit('vad_speech_end', room=session.sid)
+            # Transcribe off the handler so incoming chunks keep flowing
+            socketio.start_background_task(process_smart_pause_audio, session)
                 
     except Exception as e:
         logger.error(f"Error in smart audio: {e}")
 
-def detect_speech_in_chunk(audio_data):
-    """Simple VAD check on audio chunk"""
-    try:
-        # For WebM, we'd need to decode first
-        # For now, return True to process everything
-        # In production, decode WebM to PCM first
-        return len(audio_data) > 1000  # Simple size check
-    except Exception:
-        return False
-
 def process_smart_pause_audio(session):
     """Process audio after pause detection"""
     with session.processing_lock:
-        if not session.accumulated_audio or len(session.accumulated_audio) < 5000:
+        audio = session.get_audio()
+        if len(audio) < SAMPLE_RATE // 2:
             return
         
         try:
-            # Use accumulated audio for complete WebM
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as tmp_file:
-                tmp_file.write(session.accumulated_audio)
-                tmp_path = tmp_file.name
-            
-            # Transcribe without aggressive VAD
-            segments, info = stt.model.transcribe(
-                tmp_path,
-                language=config['whisper']['language'],
-                vad_filter=False,  # Don't filter for smart mode
-                without_timestamps=True  # Faster processing
+            # Transcribe the whole utterance with the same conservative VAD
+            segments, info = transcriber.transcribe(
+                audio,
+                language=WHISPER_LANG,
+                vad_filter=True,
+                vad_parameters=SPEECH_VAD_OPTIONS,
+                without_timestamps=True,  # Faster processing
+                **REALTIME_DECODE_OPTIONS
             )
             
             transcription = " ".join([segment.text for segment in segments]).strip()
             
-            # Clean up
-            os.unlink(tmp_path)
-            
             if transcription:
                 # Send final transcription
                 socketio.emit('transcription', 
@@ -367,9 +621,8 @@ def process_smart_pause_audio(session):
                 generate_streaming_response(session, transcription)
             
             # Clear buffer for next utterance
-            session.audio_buffer.clear()
-            session.transcription_buffer = ""
-            session.accumulated_audio = b''  # Reset accumulated audio
+            session.reset_transcript()
+            session.reset_audio()
             
         except Exception as e:
             logger.error(f"Error processing smart pause audio: {e}")
@@ -380,90 +633,118 @@ def handle_stop_smart(data=None):
     session = sessions.get(request.sid)
     if session:
         session.mode = 'ptt'
-        session.audio_buffer.clear()
+        session.stop_decoder()
         logger.info(f"Stopped smart mode for {request.sid}")
 
 # === PUSH-TO-TALK MODE (existing) ===
 @socketio.on('process_audio')
-def handle_audio(data):
-    """Process audio from client (PTT mode)"""
+def handle_audio(audio_data):
+    """Process audio from client (PTT mode, raw WebM bytes)"""
     session = sessions.get(request.sid)
     if not session:
         return
     
     try:
-        emit('status', {'message': 'Processing audio...', 'type': 'processing'})
-        
-        # Decode base64 audio
-        audio_data = base64.b64decode(data['audio'].split(',')[1] if ',' in data['audio'] else data['audio'])
-        
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as tmp_file:
-            tmp_file.write(audio_data)
-            tmp_path = tmp_file.name
-        
-        # Transcribe
-        emit('status', {'message': 'Transcribing...', 'type': 'transcribing'})
-        
-        segments, info = stt.model.transcribe(tmp_path, language=config['whisper']['language'])
-        transcription = " ".join([segment.text for segment in segments]).strip()
-        
-        if not transcription:
-            emit('error', {'message': 'No speech detected'})
-            os.unlink(tmp_path)
-            return
-        
-        # Emit transcription
-        emit('transcription', {'text': transcription})
-        
-        # Generate response
-        generate_streaming_response(session, transcription)
-        
-        # Clean up
-        os.unlink(tmp_path)
-        
+        process_audio_bytes(audio_data, emit, transcriber.transcribe,
+                            lambda text: generate_streaming_response(session, text),
+                            WHISPER_LANG)
     except Exception as e:
         logger.error(f"Error processing audio: {e}")
         emit('error', {'message': str(e)})
 
 # === SHARED FUNCTIONS ===
+# Streamed tokens are sent at most every 40 ms or 64 characters
+RESPONSE_FLUSH_INTERVAL = 0.04
+RESPONSE_FLUSH_CHARS = 64
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+
+def start_speech_pipeline(sid):
+    """Speak queued sentences with macOS 'say' on the speech thread
+
+    Sentences are spoken in order as the LLM produces them, so speech
+    starts before generation finishes and the socket handler never waits
+    on audio playback. Responses share one long-lived thread, so they
+    queue up instead of talking over each other. Put None to finish;
+    tts_complete and the Ready status are emitted once the last sentence
+    has been spoken.
+    """
+    sentences = queue.Queue()
+    
+    def speak_sentences():
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                break
+            subprocess.Popen(['say', '-v', TTS_VOICE, sentence]).wait()
+        socketio.emit('tts_complete', {}, room=sid)
+        socketio.emit('status', STATUS_READY, room=sid)
+    
+    speech_pool.submit(speak_sentences)
+    return sentences
+
+
 def generate_streaming_response(session, text):
     """Generate and stream LLM response"""
     if session.response_in_progress:
         return  # Avoid overlapping responses
     
     session.response_in_progress = True
+    speech = None
     
     try:
-        socketio.emit('status', 
-                     {'message': 'Generating response...', 'type': 'generating'},
-                     room=session.sid)
+        socketio.emit('status', STATUS_GENERATING, room=session.sid)
+        
+        speech = start_speech_pipeline(session.sid) if TTS_ENGINE == 'macos' else None
+        unspoken = ""
         
         response_text = ""
+        pending = []
+        pending_chars = 0
+        last_flush = time.monotonic()
         for chunk in llm.generate(text, stream=True):
             response_text += chunk
-            socketio.emit('response_chunk', {'text': chunk}, room=session.sid)
+            
+            # Coalesce tokens into fewer, larger frames
+            pending.append(chunk)
+            pending_chars += len(chunk)
+            now = time.monotonic()
+            if pending_chars > RESPONSE_FLUSH_CHARS or now - last_flush > RESPONSE_FLUSH_INTERVAL:
+                socketio.emit('response_chunk', {'text': ''.join(pending)}, room=session.sid)
+                pending.clear()
+                pending_chars = 0
+                last_flush = now
+            
+            # Hand finished sentences to TTS while the rest is still generating
+            if speech:
+                unspoken += chunk
+                *sentences, unspoken = SENTENCE_BOUNDARY.split(unspoken)
+                for sentence in sentences:
+                    speech.put(sentence)
+        
+        if pending:
+            socketio.emit('response_chunk', {'text': ''.join(pending)}, room=session.sid)
         
         # Complete response
         socketio.emit('response_complete', {'text': response_text}, room=session.sid)
         
         # Generate TTS if enabled
-        if config['tts']['engine'] != 'none':
-            socketio.emit('status', 
-                         {'message': 'Speaking...', 'type': 'speaking'},
-                         room=session.sid)
-            
-            if config['tts']['engine'] == 'macos':
-                import subprocess
-                voice = config['tts'].get('voice', 'Samantha')
-                subprocess.run(['say', '-v', voice, response_text])
-                socketio.emit('tts_complete', {}, room=session.sid)
+        if TTS_ENGINE != 'none':
+            socketio.emit('status', STATUS_SPEAKING, room=session.sid)
         
-        socketio.emit('status', {'message': 'Ready', 'type': 'ready'}, room=session.sid)
+        if speech:
+            if unspoken.strip():
+                speech.put(unspoken)
+            speech.put(None)  # Pipeline emits Ready when playback ends
+        else:
+            socketio.emit('status', STATUS_READY, room=session.sid)
         
     except Exception as e:
         logger.error(f"Error generating response: {e}")
         socketio.emit('error', {'message': str(e)}, room=session.sid)
+        if speech:
+            speech.put(None)
     finally:
         session.response_in_progress = False
 
@@ -2,7 +2,12 @@
 Pydantic models for request/response validation
 """
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+
+# Shared configs for models validated on every request or streamed event
+REQUEST_CONFIG = ConfigDict(extra='forbid', frozen=True, str_strip_whitespace=True)
+EVENT_CONFIG = ConfigDict(extra='forbid', frozen=True)  # No stripping: chunks carry meaningful spaces
 
 
 # Configuration Models
@@ -52,6 +57,8 @@ class ModelSwitchRequest(BaseModel):
 # Audio Processing
 class AudioProcessRequest(BaseModel):
     """Audio processing request"""
+    model_config = REQUEST_CONFIG
+
     audio: str = Field(..., description="Base64-encoded audio data")
     enable_tts: bool = Field(True, description="Enable TTS response")
 
@@ -64,6 +71,8 @@ class TranscriptionResponse(BaseModel):
 # Chat
 class ChatRequest(BaseModel):
     """Text chat request"""
+    model_config = REQUEST_CONFIG
+
     text: str = Field(..., description="User input text")
     enable_tts: bool = Field(True, description="Enable TTS response")
 
@@ -123,17 +132,23 @@ class ErrorResponse(BaseModel):
 # WebSocket Event Payloads
 class StatusEvent(BaseModel):
     """Status update event"""
+    model_config = EVENT_CONFIG
+
     message: str = Field(..., description="Status message")
     type: str = Field(..., description="Status type (processing/transcribing/generating/speaking/ready)")
 
 
 class TranscriptionEvent(BaseModel):
     """Transcription event"""
+    model_config = EVENT_CONFIG
+
     text: str = Field(..., description="Transcribed text")
 
 
 class ResponseChunkEvent(BaseModel):
     """Response chunk event"""
+    model_config = EVENT_CONFIG
+
     text: str = Field(..., description="Text chunk")
     model: str = Field(..., description="Model name")
 
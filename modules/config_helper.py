@@ -2,14 +2,63 @@
 Configuration helper functions for server settings
 """
 import os
+import copy
 import logging
 import yaml
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any
 
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader, SafeDumper
+
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4)
+def _parse_config_file(file_path: str, mtime_ns: int) -> dict:
+    """Parse a YAML config file; cached until the file's mtime changes"""
+    with open(file_path, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def load_config_file(file_path: str = 'config.yaml') -> dict:
+    """
+    Load configuration from a YAML file.
+    
+    Repeat loads of an unchanged file skip parsing. Each call returns its
+    own copy, so callers can modify it freely.
+    
+    Args:
+        file_path: Path to the YAML file
+        
+    Returns:
+        Configuration dictionary
+    """
+    mtime_ns = os.stat(file_path).st_mtime_ns
+    return copy.deepcopy(_parse_config_file(file_path, mtime_ns))
+
+
+def _first_env(*names: str, default=None):
+    """Return the first of the named environment variables that is set, else default"""
+    for name in names:
+        value = os.environ.get(name)
+        if value is not None:
+            return value
+    return default
+
+
+# Resolved server settings keyed by id(config), with the 'server' section they came from
+_server_config_cache: Dict[int, tuple] = {}
+
+
+def clear_server_config_cache():
+    """Forget resolved server settings (e.g. after env or config changes)"""
+    _server_config_cache.clear()
+
+
 def get_server_config(config: dict) -> Dict[str, Any]:
     """
     Get server configuration with environment variable override support.
@@ -19,28 +68,32 @@ def get_server_config(config: dict) -> Dict[str, Any]:
     2. Config file settings
     3. Default values
     
+    Results are memoized per config dict and recomputed whenever its
+    'server' section changes. Environment variables are read once, so call
+    clear_server_config_cache() after changing them at runtime.
+    
     Args:
         config: The main configuration dictionary
         
     Returns:
-        Dictionary with server configuration
+        Dictionary with server configuration (shared; do not modify)
     """
     server_config = config.get('server', {})
+    cached = _server_config_cache.get(id(config))
+    if cached and cached[0] == server_config:
+        return cached[1]
     
     # Get base settings with environment variable overrides
-    server_type = os.environ.get('LLM_SERVER_TYPE', server_config.get('type', 'ollama'))
-    host = os.environ.get('OLLAMA_HOST', os.environ.get('LM_STUDIO_HOST', 
-                         server_config.get('host', 'localhost')))
+    server_type = _first_env('LLM_SERVER_TYPE', default=server_config.get('type', 'ollama'))
+    host = _first_env('OLLAMA_HOST', 'LM_STUDIO_HOST', default=server_config.get('host', 'localhost'))
     
     # Handle port based on server type
     default_port = 11434 if server_type == 'ollama' else 1234
-    port = int(os.environ.get('OLLAMA_PORT', os.environ.get('LM_STUDIO_PORT', 
-                              server_config.get('port', default_port))))
+    port = int(_first_env('OLLAMA_PORT', 'LM_STUDIO_PORT', default=server_config.get('port', default_port)))
     
     # Timeout and retry settings
-    timeout = int(os.environ.get('LLM_TIMEOUT', server_config.get('timeout', 30)))
-    retry_attempts = int(os.environ.get('LLM_RETRY_ATTEMPTS', 
-                                       server_config.get('retry_attempts', 3)))
+    timeout = int(_first_env('LLM_TIMEOUT', default=server_config.get('timeout', 30)))
+    retry_attempts = int(_first_env('LLM_RETRY_ATTEMPTS', default=server_config.get('retry_attempts', 3)))
     
     # Build the configuration
     result = {
@@ -55,12 +108,12 @@ def get_server_config(config: dict) -> Dict[str, Any]:
     # Add LM Studio specific settings if applicable
     if server_type == 'lm-studio':
         lm_config = server_config.get('lm_studio', {})
-        result['api_key'] = os.environ.get('LM_STUDIO_API_KEY', 
-                                          lm_config.get('api_key', 'not-needed'))
+        result['api_key'] = _first_env('LM_STUDIO_API_KEY', default=lm_config.get('api_key', 'not-needed'))
         result['api_base_path'] = lm_config.get('base_url', '/v1')
         result['base_url'] = f"http://{host}:{port}{result['api_base_path']}"
     
     logger.info(f"Server configuration: {server_type} at {host}:{port}")
+    _server_config_cache[id(config)] = (copy.deepcopy(server_config), result)
     return result
 
 
@@ -140,6 +193,9 @@ def is_ollama(config: dict) -> bool:
     return server_config['type'] == 'ollama'
 
 
+_UNSAVED_FIELDS = frozenset({'sio', 'stt', 'tts', 'chat_service', 'audio_service', 'model_service', 'llm'})
+
+
 def save_config_to_file(config: dict, file_path: str = 'config.yaml'):
     """
     Save configuration dictionary to YAML file.
@@ -149,16 +205,15 @@ def save_config_to_file(config: dict, file_path: str = 'config.yaml'):
         file_path: Path to the YAML file
     """
     try:
-        # Create a copy to avoid internal state leaking to file
-        config_to_save = config.copy()
+        # Copy without volatile or large fields, as a precaution against internal state leaking to file
+        config_to_save = {k: v for k, v in config.items() if k not in _UNSAVED_FIELDS}
         
-        # Remove volatile or large fields if they exist as a precaution
-        fields_to_remove = ['sio', 'stt', 'tts', 'chat_service', 'audio_service', 'model_service', 'llm']
-        for field in fields_to_remove:
-            if field in config_to_save:
-                del config_to_save[field]
-                
-        with open(file_path, 'w') as f:
-            yaml.dump(config_to_save, f, default_flow_style=False, sort_keys=False)
+        # Write beside the target and rename so readers never see a partial file
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            yaml.dump(config_to_save, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False)
+        os.replace(tmp_path, file_path)
+        clear_server_config_cache()
         logger.info(f"Configuration saved to {file_path}")
     except Exception as e:
+        logger.error(f"Failed to save configuration to {file_path}: {e}")
@@ -1,15 +1,86 @@
 """
 Language Model interface using Ollama
 """
+import json
 import time
+import queue
+import hashlib
+import socket
+import string
+import threading
 import logging
-from typing import Optional, Generator, List, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Generator, List, Dict, Any, Tuple
+import httpx
 from ollama import Client
-from .llm_base import BaseLLM
+from .llm_base import BaseLLM, single_flight_connection_test
 from .config_helper import get_server_config
 
 logger = logging.getLogger(__name__)
 
+# Send small request/stream packets immediately instead of coalescing them (Nagle)
+STREAMING_SOCKET_OPTIONS = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)]
+
+
+def create_streaming_client(host: str) -> Client:
+    """Ollama client tuned for token streaming: no Nagle delay, no compressed bodies"""
+    return Client(
+        host=host,
+        # Fail fast on an unreachable host, but never time out between chunks
+        timeout=httpx.Timeout(None, connect=5.0),
+        # Compressed bodies are buffered for decoding before chunks surface
+        headers={'Accept-Encoding': 'identity'},
+        transport=httpx.HTTPTransport(socket_options=STREAMING_SOCKET_OPTIONS)
+    )
+
+
+
+def prefetch(iterable, maxsize: int = 32):
+    """
+    Iterate from a background thread, reading up to maxsize items ahead
+    
+    Keeps the HTTP stream draining while the consumer is busy with the
+    previous chunk (e.g. speaking it), so network reads never wait on it.
+    
+    Args:
+        iterable: Source of items, e.g. a streaming response
+        maxsize: Maximum number of items buffered ahead of the consumer
+        
+    Yields:
+        Items from iterable in order; errors are re-raised in the consumer
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item) -> bool:
+        # Poll so the reader exits if the consumer goes away while the buffer is full
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def read():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(done)
+    
+    threading.Thread(target=read, daemon=True).start()
+    try:
+        while (item := buffer.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
 
 class OllamaLLM(BaseLLM):
     """Ollama Language Model interface"""
@@ -18,11 +89,48 @@ class OllamaLLM(BaseLLM):
         super().__init__(config)
         self.server_config = get_server_config(config)
         self.client = None
-        self.model = config['ollama']['model']
-        self.fallback_model = config['ollama'].get('fallback_model')
+        ollama_config = config['ollama']
+        self.model = ollama_config['model']
+        self.fallback_model = ollama_config.get('fallback_model')
+        
+        # Request settings are resolved once here rather than on every turn;
+        # the setters below keep them current when changed at runtime
+        self._options = {
+            'temperature': ollama_config.get('temperature', 0.7),
+            'num_predict': ollama_config.get('max_tokens', 500),
+        }
+        # Keep the model resident so Ollama can reuse the KV cache for the
+        # unchanged conversation prefix instead of re-evaluating it each turn
+        self.keep_alive = ollama_config.get('keep_alive', '30m')
+        self.system_prompt = ollama_config.get('system_prompt')
         # Conversation manager is initialized in BaseLLM
         self.setup()
     
+    @property
+    def temperature(self) -> float:
+        return self._options['temperature']
+    
+    @temperature.setter
+    def temperature(self, temperature: float):
+        # Replace rather than mutate, so an in-flight request keeps its options
+        self._options = {**self._options, 'temperature': temperature}
+    
+    @property
+    def max_tokens(self) -> int:
+        return self._options['num_predict']
+    
+    @max_tokens.setter
+    def max_tokens(self, max_tokens: int):
+        self._options = {**self._options, 'num_predict': max_tokens}
+    
+    @property
+    def system_prompt(self) -> Optional[str]:
+        return self._system_message['content'] if self._system_message else None
+    
+    @system_prompt.setter
+    def system_prompt(self, system_prompt: Optional[str]):
+        self._system_message = {"role": "system", "content": system_prompt} if system_prompt else None
+    
     def setup(self):
         """Initialize Ollama client with custom host configuration"""
         try:
@@ -32,7 +140,7 @@ class OllamaLLM(BaseLLM):
             
             # Try configured host first
             try:
-                self.client = Client(host=host)
+                self.client = create_streaming_client(host)
                 # Test connection
                 models = self.client.list()
                 logger.info(f"Successfully connected to {host}")
@@ -42,7 +150,7 @@ class OllamaLLM(BaseLLM):
                 # Fallback to localhost:11434 if custom host fails
                 if host != "http://localhost:11434":
                     logger.info("Falling back to localhost:11434")
-                    self.client = Client(host="http://localhost:11434")
+                    self.client = create_streaming_client("http://localhost:11434")
                     models = self.client.list()
                     logger.info("Connected to fallback server at localhost:11434")
                 else:
@@ -85,6 +193,9 @@ class OllamaLLM(BaseLLM):
             logger.error(f"Failed to connect to Ollama: {e}")
             logger.info("Please make sure Ollama is running: 'ollama serve'")
             raise
+        
+        # Load the model in the background so the first request doesn't pay for it
+        threading.Thread(target=self.prewarm, daemon=True).start()
 
     def _parse_models(self, models) -> List[str]:
         """Helper to parse models from different Ollama API response formats"""
@@ -111,6 +222,7 @@ class OllamaLLM(BaseLLM):
             logger.error(f"Error listing models: {e}")
             return []
 
+    @single_flight_connection_test
     def test_connection(self) -> tuple[bool, str]:
         """Test connection to Ollama server"""
         try:
@@ -124,89 +236,135 @@ class OllamaLLM(BaseLLM):
         # Add user message to conversation
         self.conversation.add_message("user", prompt)
         
-        # Get conversation context
-        messages = self.conversation.get_context(
-            system_prompt=self.config['ollama'].get('system_prompt')
-        )
-        
-        # Generation parameters
-        options = {
-            'temperature': self.config['ollama'].get('temperature', 0.7),
-            'num_predict': self.config['ollama'].get('max_tokens', 500),
-        }
+        # Get conversation context; the client walks it once while building
+        # the request body, so no intermediate list is needed
+        messages = self.conversation.iter_context(system_message=self._system_message)
         
         try:
             start_time = time.time()
             first_token_time = None
-            full_response = ""
+            parts = []
+            final = None  # last response object, carries Ollama's eval stats
             
             # Stream response
             response = self.client.chat(
                 model=self.model,
                 messages=messages,
                 stream=stream,
-                options=options
+                options=self._options,
+                keep_alive=self.keep_alive
             )
             
             if stream:
-                for chunk in response:
+                for chunk in prefetch(response):
                     if first_token_time is None:
                         first_token_time = time.time()
-                        latency = (first_token_time - start_time) * 1000
-                        logger.info(f"First token latency: {latency:.0f}ms")
+                        if logger.isEnabledFor(logging.INFO):
+                            logger.info(f"First token latency: {(first_token_time - start_time) * 1000:.0f}ms")
                     
                     content = chunk['message']['content']
-                    full_response += content
+                    parts.append(content)
                     yield content
+                    
+                    if chunk.get('done'):
+                        final = chunk
+                        self._log_prompt_eval(chunk)
+                full_response = "".join(parts)
             else:
                 full_response = response['message']['content']
+                final = response
+                self._log_prompt_eval(response)
                 yield full_response
             
             # Add assistant response to conversation
             self.conversation.add_message("assistant", full_response)
             
-            # Log performance metrics
-            total_time = time.time() - start_time
-            tokens = len(full_response.split())
-            tokens_per_sec = tokens / total_time if total_time > 0 else 0
-            logger.info(f"Generated {tokens} tokens in {total_time:.2f}s ({tokens_per_sec:.1f} t/s)")
+            # Log performance metrics; Ollama reports the generated token
+            # count, so the response text never needs re-scanning
+            if logger.isEnabledFor(logging.INFO):
+                total_time = time.time() - start_time
+                # Fall back to one token per streamed chunk, or ~4 characters per token
+                tokens = (final.get('eval_count') if final else None) or len(parts) or len(full_response) // 4
+                tokens_per_sec = tokens / total_time if total_time > 0 else 0
+                logger.info(f"Generated {tokens} tokens in {total_time:.2f}s ({tokens_per_sec:.1f} t/s)")
             
         except Exception as e:
             logger.error(f"Generation error: {e}")
             yield f"Error: {str(e)}"
     
+    def prewarm(self):
+        """Load the model and its system prompt cache, logging instead of raising on failure"""
+        try:
+            start_time = time.time()
+            self.prime_prompt_cache()
+            logger.info(f"Model {self.model} warmed up in {time.time() - start_time:.2f}s")
+        except Exception as e:
+            logger.warning(f"Model prewarm failed: {e}")
+    
+    def prime_prompt_cache(self):
+        """Evaluate the system prompt once so later turns reuse its KV cache"""
+        messages = [self._system_message] if self._system_message else []
+        
+        # A single generated token is enough to push the prefix through prefill
+        response = self.client.chat(
+            model=self.model,
+            messages=messages,
+            options={'num_predict': 1},
+            keep_alive=self.keep_alive
+        )
+        self._log_prompt_eval(response)
+    
+    def _log_prompt_eval(self, response):
+        """Log prompt evaluation stats (low counts mean the cached prefix was reused)"""
+        prompt_tokens = response.get('prompt_eval_count')
+        if prompt_tokens is not None:
+            prompt_ms = (response.get('prompt_eval_duration') or 0) / 1e6
+            logger.info(f"Prompt eval: {prompt_tokens} tokens in {prompt_ms:.0f}ms")
+    
     # clear_conversation and get_conversation_summary are inherited from BaseLLM
 
 
+_STRIP_PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Prompt text that ignores case, punctuation and spacing differences
+    
+    Only safe inside a cache key that also covers the conversation context
+    and model options; on its own it makes unrelated turns collide.
+    """
+    return ' '.join(prompt.lower().translate(_STRIP_PUNCTUATION).split())
+
+
 class ResponseCache:
     """Cache common responses for faster replies"""
     
     def __init__(self, max_size: int = 100):
-        self.cache: Dict[str, str] = {}
+        # Response chunks per key, least recently used first; callers build the keys
+        self.cache: OrderedDict[Any, Tuple[str, ...]] = OrderedDict()
         self.max_size = max_size
         self.hits = 0
         self.misses = 0
     
-    def get(self, prompt: str) -> Optional[str]:
-        """Get cached response"""
-        # Simple exact match for now
-        response = self.cache.get(prompt.lower().strip())
+    def get(self, key) -> Optional[Tuple[str, ...]]:
+        """Get the cached response chunks"""
+        response = self.cache.get(key)
         if response:
+            self.cache.move_to_end(key)
             self.hits += 1
-            logger.debug(f"Cache hit for: {prompt[:50]}...")
+            logger.debug("Response cache hit")
             return response
         
         self.misses += 1
         return None
     
-    def set(self, prompt: str, response: str):
-        """Cache a response"""
-        if len(self.cache) >= self.max_size:
-            # Remove oldest entry (simple FIFO)
-            oldest = next(iter(self.cache))
-            del self.cache[oldest]
-        
-        self.cache[prompt.lower().strip()] = response
+    def set(self, key, response: Tuple[str, ...]):
+        """Cache response chunks, evicting the least recently used entry when full"""
+        self.cache[key] = response
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
@@ -232,19 +390,35 @@ class OptimizedOllamaLLM(OllamaLLM):
     
     def generate(self, prompt: str, stream: bool = True) -> Generator[str, None, None]:
         """Generate with caching support"""
-        # Check cache first
-        if self.cache and not stream:
-            cached = self.cache.get(prompt)
-            if cached:
-                yield cached
-                return
+        if not self.cache:
+            yield from super().generate(prompt, stream)
+            return
+        
+        # Check cache first; streaming callers get the original chunks replayed
+        key = self._cache_key(prompt)
+        cached = self.cache.get(key)
+        if cached:
+            # Record the turn as if generated, so history matches what the user saw
+            self.conversation.add_message("user", prompt)
+            self.conversation.add_message("assistant", "".join(cached))
+            if stream:
+                yield from cached
+            else:
+                yield "".join(cached)
+            return
         
         # Generate response
-        full_response = ""
+        parts = []
         for chunk in super().generate(prompt, stream):
-            full_response += chunk
+            parts.append(chunk)
             yield chunk
         
-        # Cache the response
-        if self.cache and not stream:
-            self.cache.set(prompt, full_response)
\ No newline at end of file
+        # Cache the response (failures come back as a single "Error: ..." chunk)
+        if parts and not parts[0].startswith("Error: "):
+            self.cache.set(key, tuple(parts))
+    
+    def _cache_key(self, prompt: str) -> bytes:
+        """Hash of the model, options, conversation so far and (normalized) new prompt"""
+        context = self.conversation.get_context(system_message=self._system_message)
+        payload = json.dumps([self.model, self._options, context, normalize_prompt(prompt)])
+        return hashlib.blake2b(payload.encode(), digest_size=16).digest()
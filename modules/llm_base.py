@@ -2,24 +2,42 @@
 Base LLM interface for multiple server types
 """
 from abc import ABC, abstractmethod
-from typing import Generator, Dict, Any, Optional, List
-from dataclasses import dataclass
+from typing import Generator, AsyncGenerator, Iterator, Dict, Any, Optional, List
+from itertools import chain
+from dataclasses import dataclass, field
 from datetime import datetime
+import functools
+import time
+import asyncio
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Per-message allowance for role markers and template tokens
+MESSAGE_OVERHEAD_TOKENS = 4
 
-@dataclass
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for a message (about 4 characters per token)"""
+    return len(text) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass(slots=True)
 class Message:
     """Unified message format for all LLM implementations"""
     role: str  # 'user', 'assistant', or 'system'
     content: str
-    timestamp: datetime = None
+    created_ns: int = field(default_factory=time.time_ns, repr=False)  # epoch nanoseconds
+    tokens: int = field(default=0, init=False, repr=False, compare=False)
     
     def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.now()
+        self.tokens = estimate_tokens(self.content)
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Creation time, converted only when read"""
+        return datetime.fromtimestamp(self.created_ns / 1e9)
     
     def to_dict(self) -> Dict[str, str]:
         """Convert to dictionary format"""
@@ -29,35 +47,86 @@ class Message:
 class ConversationManagerBase:
     """Base conversation management for all LLM types"""
     
+    __slots__ = ('_messages', '_context', '_total_tokens', 'max_history', 'max_tokens')
+    
     def __init__(self, max_history: int = 10, max_tokens: int = 4096):
-        self.messages: List[Message] = []
+        self._messages: List[Message] = []
+        self._context: List[Dict[str, str]] = []  # to_dict() of each message, kept in lockstep
+        self._total_tokens = 0  # Running sum of message token estimates
         self.max_history = max_history
         self.max_tokens = max_tokens
     
+    @property
+    def messages(self) -> List[Message]:
+        """Conversation history (assign a new list rather than mutating this one)"""
+        return self._messages
+    
+    @messages.setter
+    def messages(self, messages: List[Message]):
+        self._messages = list(messages)
+        self._context = [msg.to_dict() for msg in self._messages]
+        self._total_tokens = sum(msg.tokens for msg in self._messages)
+    
     def add_message(self, role: str, content: str) -> Message:
         """Add a message to the conversation"""
         message = Message(role=role, content=content)
-        self.messages.append(message)
+        self._messages.append(message)
+        self._context.append(message.to_dict())
+        self._total_tokens += message.tokens
         
         # Trim history if needed (keep pairs)
-        if len(self.messages) > self.max_history * 2:
-            self.messages = self.messages[-self.max_history * 2:]
+        drop = max(len(self._messages) - self.max_history * 2, 0)
+        total = self._total_tokens - sum(m.tokens for m in self._messages[:drop])
+        
+        # Then drop the oldest messages until the history fits the token
+        # budget, so long messages can't inflate prompt processing time
+        while total > self.max_tokens and drop < len(self._messages) - 1:
+            total -= self._messages[drop].tokens
+            drop += 1
+        if drop:
+            del self._messages[:drop]
+            del self._context[:drop]
+            self._total_tokens = total
         
         return message
     
-    def get_context(self, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
-        """Get conversation context for LLM"""
-        context = []
+    def get_context(self, system_prompt: Optional[str] = None,
+                    system_message: Optional[Dict[str, str]] = None) -> List[Dict[str, str]]:
+        """
+        Get conversation context for LLM
         
-        # Add system prompt if provided
-        if system_prompt:
-            context.append({"role": "system", "content": system_prompt})
+        Args:
+            system_prompt: System prompt text to prepend
+            system_message: Prebuilt system message dict, used instead of system_prompt
+        """
+        if system_message is None and system_prompt:
+            system_message = {"role": "system", "content": system_prompt}
+        
+        # Message dicts are built once in add_message; only the list is copied here
+        if system_message:
+            return [system_message, *self._context]
+        return self._context[:]
+    
+    def iter_context(self, system_message: Optional[Dict[str, str]] = None) -> Iterator[Dict[str, str]]:
+        """
+        Iterate the conversation context without copying it into a new list
         
-        # Add conversation history
-        for msg in self.messages:
-            context.append(msg.to_dict())
+        The iterator reads the live history, so consume it before the
+        conversation changes (e.g. pass it straight to a client call).
         
-        return context
+        Args:
+            system_message: Prebuilt system message dict to yield first
+        """
+        if system_message:
+            return chain((system_message,), self._context)
+        return iter(self._context)
+    
+    def take_over(self, other: 'ConversationManagerBase'):
+        """Move other's history into this conversation without copying, leaving other empty"""
+        self._messages, self._context = other._messages, other._context
+        self._total_tokens = other._total_tokens
+        other._messages, other._context = [], []
+        other._total_tokens = 0
     
     def clear(self):
         """Clear conversation history"""
@@ -77,6 +146,30 @@ class ConversationManagerBase:
         return summary
 
 
+# Seconds a successful connection test is reused before probing the server again
+CONNECTION_TEST_TTL = 30.0
+
+
+def single_flight_connection_test(test_connection):
+    """
+    Coalesce connection tests on one LLM instance
+    
+    Concurrent callers share a single in-flight probe, and a successful
+    result is reused for CONNECTION_TEST_TTL seconds. Failures are not
+    cached, so a retry after starting the server probes again.
+    """
+    @functools.wraps(test_connection)
+    def wrapper(self) -> tuple[bool, str]:
+        with self._connection_test_lock:
+            cached = self._connection_test_result
+            if cached and time.monotonic() - cached[0] < CONNECTION_TEST_TTL:
+                return cached[1]
+            result = test_connection(self)
+            self._connection_test_result = (time.monotonic(), result) if result[0] else None
+            return result
+    return wrapper
+
+
 class BaseLLM(ABC):
     """Abstract base class for all LLM implementations"""
     
@@ -93,6 +186,8 @@ class BaseLLM(ABC):
         )
         self.model = None
         self.client = None
+        self._connection_test_lock = threading.Lock()
+        self._connection_test_result = None  # (monotonic time, result) of the last successful test
     
     @abstractmethod
     def setup(self):
@@ -148,6 +243,54 @@ class BaseLLM(ABC):
             response += chunk
         return response
     
+    async def agenerate(self, prompt: str, stream: bool = True,
+                        buffer_size: int = 8) -> AsyncGenerator[str, None]:
+        """
+        Generate response without blocking the event loop
+        
+        A worker thread reads chunks ahead into a bounded buffer, so receiving
+        the next chunk overlaps with the caller handling the current one.
+        
+        Args:
+            prompt: The user's input prompt
+            stream: Whether to stream the response
+            buffer_size: Maximum number of chunks read ahead of the caller
+            
+        Yields:
+            Response chunks as strings
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        slots = threading.Semaphore(buffer_size)
+        stop = threading.Event()
+        done = object()
+        
+        def produce():
+            try:
+                for chunk in self.generate(prompt, stream=stream):
+                    slots.acquire()
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                if not stop.is_set():
+                    loop.call_soon_threadsafe(chunks.put_nowait, done)
+        
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while (chunk := await chunks.get()) is not done:
+                slots.release()
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+        finally:
+            # Unblock the producer if the caller stopped early
+            stop.set()
+            slots.release()
+        await producer
+    
     def clear_conversation(self):
         """Clear conversation history"""
         self.conversation.clear()
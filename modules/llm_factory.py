@@ -2,14 +2,50 @@
 Factory for creating appropriate LLM instances based on server type
 """
 import logging
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
 from .config_helper import get_server_config
 from .llm import OllamaLLM, OptimizedOllamaLLM
-from .llm_lmstudio import LMStudioLLM
+from .llm_lmstudio import LMStudioLLM, invalidate_models_cache
 from .llm_base import BaseLLM
 
 logger = logging.getLogger(__name__)
 
+# (connect, read) timeouts for detection probes; a local server connects at once
+PROBE_TIMEOUT = (0.5, 2)
+
+# Shared session so repeat probes of the same host reuse their connections
+_probe_session = requests.Session()
+_probe_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+_probe_session.mount('http://', _probe_adapter)
+_probe_session.mount('https://', _probe_adapter)
+
+
+def _create_ollama(config: dict, optimized: bool) -> BaseLLM:
+    """Ollama, with response caching unless disabled"""
+    if optimized and config.get('performance', {}).get('cache_responses', True):
+        logger.info("Using optimized Ollama with caching")
+        return OptimizedOllamaLLM(config)
+    logger.info("Using standard Ollama")
+    return OllamaLLM(config)
+
+
+def _create_lm_studio(config: dict, optimized: bool) -> BaseLLM:
+    """LM Studio through its OpenAI-compatible API"""
+    logger.info("Using LM Studio OpenAI-compatible API")
+    return LMStudioLLM(config)
+
+
+# Server type -> constructor taking (config, optimized); register new providers here
+_PROVIDERS: Dict[str, Callable[[dict, bool], BaseLLM]] = {
+    'ollama': _create_ollama,
+    'lm-studio': _create_lm_studio,
+}
+
 
 def create_llm(config: dict, optimized: bool = True) -> BaseLLM:
     """
@@ -28,95 +64,75 @@ def create_llm(config: dict, optimized: bool = True) -> BaseLLM:
     logger.info(f"Creating LLM instance for server type: {server_type}")
     
     try:
-        if server_type == 'ollama':
-            # Use Ollama implementation
-            if optimized and config.get('performance', {}).get('cache_responses', True):
-                logger.info("Using optimized Ollama with caching")
-                return OptimizedOllamaLLM(config)
-            else:
-                logger.info("Using standard Ollama")
-                return OllamaLLM(config)
-        
-        elif server_type == 'lm-studio':
-            # Use LM Studio implementation
-            logger.info("Using LM Studio OpenAI-compatible API")
-            return LMStudioLLM(config)
-        
-        elif server_type == 'custom':
+        if server_type == 'custom':
             # For custom servers, try to detect the type
-            detected_type = detect_server_type(server_config['base_url'])
-            logger.info(f"Detected server type: {detected_type}")
-            
-            if detected_type == 'ollama':
-                return OllamaLLM(config) if not optimized else OptimizedOllamaLLM(config)
-            elif detected_type == 'lm-studio':
-                return LMStudioLLM(config)
-            else:
-                # Default to Ollama for unknown types
-                logger.warning("Unknown server type, defaulting to Ollama")
-                return OllamaLLM(config)
+            server_type = detect_server_type(server_config['base_url'])
+            logger.info(f"Detected server type: {server_type}")
         
-        else:
+        factory = _PROVIDERS.get(server_type)
+        if factory is None:
             # Default to Ollama for unknown types
             logger.warning(f"Unknown server type '{server_type}', defaulting to Ollama")
             return OllamaLLM(config)
+        return factory(config, optimized)
     
     except Exception as e:
         logger.error(f"Failed to create LLM instance: {e}")
         logger.info("Falling back to default Ollama configuration")
         
         # Fallback to default Ollama
-        fallback_config = config.copy()
-        fallback_config['server'] = {
+        fallback_config = {**config, 'server': {
             'type': 'ollama',
             'host': 'localhost',
             'port': 11434
-        }
+        }}
         return OllamaLLM(fallback_config)
 
 
+def _probe(url: str) -> bool:
+    """Return True if a GET on url answers 200"""
+    try:
+        return _probe_session.get(url, timeout=PROBE_TIMEOUT).status_code == 200
+    except Exception:
+        return False
+
+
 def detect_server_type(base_url: str) -> str:
     """
     Detect the type of LLM server by checking its endpoints
     
+    All endpoints are probed at once; the first match in priority order wins.
+    
     Args:
         base_url: Base URL of the server
         
     Returns:
         'ollama', 'lm-studio', or 'unknown'
     """
-    import requests
-    
     # Remove trailing slash
     base_url = base_url.rstrip('/')
     
-    # Check for Ollama
-    try:
-        response = requests.get(f"{base_url}/api/tags", timeout=2)
-        if response.status_code == 200:
-            logger.info("Detected Ollama server")
-            return 'ollama'
-    except Exception:
-        pass
-    
-    # Check for LM Studio (OpenAI-compatible)
-    try:
-        response = requests.get(f"{base_url}/v1/models", timeout=2)
-        if response.status_code == 200:
-            logger.info("Detected LM Studio server")
-            return 'lm-studio'
-    except Exception:
-        pass
-    
+    # (url, server type, log message), in priority order: Ollama also serves
+    # /v1/models, so its own endpoint has to be checked first
+    probes = [
+        (f"{base_url}/api/tags", 'ollama', "Detected Ollama server"),
+        (f"{base_url}/v1/models", 'lm-studio', "Detected LM Studio server"),
+    ]
     # Check if base URL already includes /v1 (common for OpenAI-compatible)
     if '/v1' in base_url:
-        try:
-            response = requests.get(f"{base_url}/models", timeout=2)
-            if response.status_code == 200:
-                logger.info("Detected OpenAI-compatible server (likely LM Studio)")
-                return 'lm-studio'
-        except Exception:
-            pass
+        probes.append((f"{base_url}/models", 'lm-studio',
+                       "Detected OpenAI-compatible server (likely LM Studio)"))
+    
+    pool = ThreadPoolExecutor(max_workers=len(probes))
+    try:
+        futures = [pool.submit(_probe, url) for url, _, _ in probes]
+        for future, (_, server_type, message) in zip(futures, probes):
+            if future.result():
+                logger.info(message)
+                return server_type
+    finally:
+        # Don't wait on lower-priority probes once a match is found
+        pool.shutdown(wait=False)
     
     logger.warning("Could not detect server type")
     return 'unknown'
@@ -159,18 +175,16 @@ def switch_llm_server(current_llm: Optional[BaseLLM], new_config: dict) -> BaseL
     Returns:
         New BaseLLM instance
     """
-    # Save conversation history if exists
-    conversation_history = None
-    if current_llm:
-        conversation_history = current_llm.conversation.messages.copy()
-        logger.info(f"Preserving {len(conversation_history)} messages from previous conversation")
+    # The target server may have loaded or unloaded models since it was last listed
+    invalidate_models_cache()
     
     # Create new LLM instance
     new_llm = create_llm(new_config)
     
-    # Restore conversation history if available
-    if conversation_history:
-        new_llm.conversation.messages = conversation_history
+    # The previous instance is being discarded, so its history moves over rather than being copied
+    if current_llm and current_llm.conversation.messages:
+        logger.info(f"Preserving {len(current_llm.conversation.messages)} messages from previous conversation")
+        new_llm.conversation.take_over(current_llm.conversation)
         logger.info("Conversation history restored")
     
     return new_llm
\ No newline at end of file
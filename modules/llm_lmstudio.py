@@ -1,16 +1,56 @@
 """
 LM Studio LLM implementation using OpenAI-compatible API
 """
+import os
+import re
+import json
+import asyncio
+import hashlib
 import time
 import logging
-from typing import Generator, List, Dict, Any
-from openai import OpenAI
+import weakref
+from collections import OrderedDict
+from typing import Generator, AsyncGenerator, List, Dict, Any, Optional, Tuple
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
 import requests
-from .llm_base import BaseLLM, ConversationManagerBase
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .llm_base import BaseLLM, ConversationManagerBase, single_flight_connection_test
 from .config_helper import get_server_config
 
 logger = logging.getLogger(__name__)
 
+# Embedding model ids ('embed' also covers embedding, text-embedding-, nomic-embed)
+_EMBEDDING_MODEL_RE = re.compile(r'embed|bge-|e5-|gte-|instructor-', re.IGNORECASE)
+
+# Filtered model lists per API base, as (fetch time, models); reused for _MODELS_TTL seconds
+_MODELS_CACHE: Dict[str, Tuple[float, List[str]]] = {}
+_MODELS_TTL = 300
+
+
+def invalidate_models_cache() -> None:
+    """Forget every cached model list, e.g. after switching servers"""
+    _MODELS_CACHE.clear()
+
+
+# Entries kept per instance when lm_studio.cache_enabled is set
+RESPONSE_CACHE_SIZE = 128
+
+# Concurrent async generations; keep within LM Studio's "Max Concurrent Predictions" setting
+MAX_CONCURRENT_PREDICTIONS = 4
+# One semaphore per event loop, created on first use inside that loop
+_predictions: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = weakref.WeakKeyDictionary()
+
+
+def _prediction_slots() -> asyncio.Semaphore:
+    """Semaphore limiting concurrent generations on the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _predictions.get(loop)
+    if semaphore is None:
+        semaphore = _predictions[loop] = asyncio.Semaphore(MAX_CONCURRENT_PREDICTIONS)
+    return semaphore
+
 
 class LMStudioLLM(BaseLLM):
     """LM Studio Language Model implementation using OpenAI client"""
@@ -43,8 +83,21 @@ class LMStudioLLM(BaseLLM):
                                    config.get('ollama', {}).get('context_window', 4096))
         self.conversation = ConversationManagerBase(max_tokens=context_window)
         
+        # Final responses by request hash, least recently used first; only
+        # deterministic (temperature 0) requests are served from it
+        self.cache_enabled = config.get('lm_studio', {}).get('cache_enabled', False)
+        self._response_cache: OrderedDict[bytes, str] = OrderedDict()
+        
         self.setup()
     
+    @property
+    def system_prompt(self) -> Optional[str]:
+        return self._system_message['content'] if self._system_message else None
+    
+    @system_prompt.setter
+    def system_prompt(self, system_prompt: Optional[str]):
+        self._system_message = {"role": "system", "content": system_prompt} if system_prompt else None
+    
     def setup(self):
         """Initialize OpenAI client for LM Studio"""
         try:
@@ -53,9 +106,24 @@ class LMStudioLLM(BaseLLM):
             # Initialize OpenAI client with LM Studio endpoint
             self.client = OpenAI(
                 api_key=self.api_key,  # LM Studio doesn't require a real API key
-                base_url=self.api_base
+                base_url=self.api_base,
+                http_client=DefaultHttpxClient(limits=httpx.Limits(max_keepalive_connections=8))
+            )
+            
+            # Async twin for generation on the event loop (agenerate)
+            self.aclient = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.api_base,
+                http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(max_keepalive_connections=8))
             )
             
+            # Keep-alive session for plain REST calls (connection tests)
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                                  max_retries=Retry(total=2, backoff_factor=0.1))
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+            
             # Test connection and get available models
             available_models = self.list_models()
             
@@ -98,7 +166,21 @@ class LMStudioLLM(BaseLLM):
             raise
     
     def list_models(self) -> List[str]:
-        """List available LLM models from LM Studio (excludes embedding models)"""
+        """
+        List available LLM models from LM Studio (excludes embedding models)
+        
+        Results are shared across instances for the same server for a few
+        minutes (set ASSISTEDVOICE_DISABLE_MODEL_CACHE to turn this off);
+        use refresh_models() to force a fresh listing.
+        """
+        if not os.environ.get('ASSISTEDVOICE_DISABLE_MODEL_CACHE'):
+            cached = _MODELS_CACHE.get(self.api_base)
+            if cached and time.monotonic() - cached[0] < _MODELS_TTL:
+                return list(cached[1])
+        return self.refresh_models()
+    
+    def refresh_models(self) -> List[str]:
+        """Fetch the model list from LM Studio, bypassing and updating the cache"""
         try:
             # Try to get models list from LM Studio
             models_response = self.client.models.list()
@@ -114,18 +196,7 @@ class LMStudioLLM(BaseLLM):
                             model_id = model.id
 
                             # Filter out embedding models based on common patterns
-                            is_embedding = any([
-                                'embedding' in model_id.lower(),
-                                'embed' in model_id.lower(),
-                                model_id.lower().startswith('text-embedding-'),
-                                'nomic-embed' in model_id.lower(),
-                                'bge-' in model_id.lower(),
-                                'e5-' in model_id.lower(),
-                                'gte-' in model_id.lower(),
-                                'instructor-' in model_id.lower()
-                            ])
-
-                            if is_embedding:
+                            if _EMBEDDING_MODEL_RE.search(model_id):
                                 filtered_count += 1
                                 logger.debug(f"Filtered out embedding model: {model_id}")
                             else:
@@ -134,18 +205,20 @@ class LMStudioLLM(BaseLLM):
             if filtered_count > 0:
                 logger.info(f"Filtered {filtered_count} embedding model(s), {len(available_models)} LLM(s) available")
 
-            return available_models
+            _MODELS_CACHE[self.api_base] = (time.monotonic(), available_models)
+            return list(available_models)
 
         except Exception as e:
             logger.warning(f"Could not list models from LM Studio: {e}")
             # Return empty list but don't fail - LM Studio might still work
             return []
     
+    @single_flight_connection_test
     def test_connection(self) -> tuple[bool, str]:
         """Test connection to LM Studio server"""
         try:
             # Try to list models as a connection test
-            response = requests.get(
+            response = self._session.get(
                 f"{self.api_base}/models",
                 headers={"Authorization": f"Bearer {self.api_key}"},
                 timeout=5
@@ -170,13 +243,20 @@ class LMStudioLLM(BaseLLM):
         # Add user message to conversation
         self.conversation.add_message("user", prompt)
         
-        # Get conversation context
-        messages = self.conversation.get_context(system_prompt=self.system_prompt)
+        # History is stored as OpenAI-shaped dicts already; the client walks
+        # them once while building the request body, so no list is copied
+        messages = self.conversation.iter_context(system_message=self._system_message)
+        
+        cache_key = self._cache_key()
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
         
         try:
             start_time = time.time()
             first_token_time = None
-            full_response = ""
+            parts = []
             
             # Create chat completion with OpenAI client
             response = self.client.chat.completions.create(
@@ -198,32 +278,116 @@ class LMStudioLLM(BaseLLM):
                     # Extract content from chunk
                     if chunk.choices and chunk.choices[0].delta.content:
                         content = chunk.choices[0].delta.content
-                        full_response += content
+                        parts.append(content)
                         yield content
+                full_response = "".join(parts)
             else:
                 # Non-streaming response
+                full_response = ""
                 if response.choices and response.choices[0].message.content:
                     full_response = response.choices[0].message.content
                     yield full_response
             
-            # Add assistant response to conversation
-            self.conversation.add_message("assistant", full_response)
-            
-            # Log performance metrics
-            total_time = time.time() - start_time
-            tokens = len(full_response.split())
-            tokens_per_sec = tokens / total_time if total_time > 0 else 0
-            logger.info(f"Generated {tokens} tokens in {total_time:.2f}s ({tokens_per_sec:.1f} t/s)")
+            self._finish_response(full_response, start_time, cache_key)
         
         except Exception as e:
-            error_msg = f"LM Studio generation error: {str(e)}"
-            logger.error(error_msg)
+            yield self._error_reply(e)
+    
+    async def agenerate(self, prompt: str, stream: bool = True,
+                        buffer_size: int = 8) -> AsyncGenerator[str, None]:
+        """
+        Generate response from LM Studio on the event loop
+        
+        Uses the async client directly, so no worker thread is tied up per
+        stream and several generations can overlap. buffer_size is unused.
+        """
+        self.conversation.add_message("user", prompt)
+        messages = self.conversation.iter_context(system_message=self._system_message)
+        
+        cache_key = self._cache_key()
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        async with _prediction_slots():
+            try:
+                start_time = time.time()
+                first_token_time = None
+                parts = []
+                
+                response = await self.aclient.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=self.temperature,
+                    max_tokens=self.max_tokens,
+                    stream=stream
+                )
+                
+                if stream:
+                    async for chunk in response:
+                        if first_token_time is None:
+                            first_token_time = time.time()
+                            latency = (first_token_time - start_time) * 1000
+                            logger.info(f"First token latency: {latency:.0f}ms")
+                        
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            content = chunk.choices[0].delta.content
+                            parts.append(content)
+                            yield content
+                    full_response = "".join(parts)
+                else:
+                    full_response = ""
+                    if response.choices and response.choices[0].message.content:
+                        full_response = response.choices[0].message.content
+                        yield full_response
+                
+                self._finish_response(full_response, start_time, cache_key)
             
-            # Check if it's a connection error
-            if "Connection" in str(e) or "refused" in str(e):
-                yield "Error: Cannot connect to LM Studio. Please ensure LM Studio is running with a model loaded."
-            else:
-                yield f"Error: {str(e)}"
+            except Exception as e:
+                yield self._error_reply(e)
+    
+    def _cache_key(self) -> Optional[bytes]:
+        """Hash of everything that determines the reply, or None if it can't be cached"""
+        if not self.cache_enabled or self.temperature != 0:
+            return None
+        context = self.conversation.get_context(system_message=self._system_message)
+        payload = json.dumps([self.model, context, self.temperature, self.max_tokens])
+        return hashlib.blake2b(payload.encode(), digest_size=16).digest()
+    
+    def _cached_response(self, cache_key: Optional[bytes]) -> Optional[str]:
+        """Cached reply for cache_key, recorded in the conversation as if generated"""
+        if cache_key is None or cache_key not in self._response_cache:
+            return None
+        self._response_cache.move_to_end(cache_key)
+        response = self._response_cache[cache_key]
+        self.conversation.add_message("assistant", response)
+        logger.debug("Serving LM Studio response from cache")
+        return response
+    
+    def _finish_response(self, full_response: str, start_time: float,
+                         cache_key: Optional[bytes] = None):
+        """Add the assistant response to the conversation, cache it and log metrics"""
+        self.conversation.add_message("assistant", full_response)
+        
+        if cache_key is not None and full_response:
+            self._response_cache[cache_key] = full_response
+            if len(self._response_cache) > RESPONSE_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+        
+        total_time = time.time() - start_time
+        tokens = len(full_response) // 4  # ~4 characters per token
+        tokens_per_sec = tokens / total_time if total_time > 0 else 0
+        logger.info(f"Generated {tokens} tokens in {total_time:.2f}s ({tokens_per_sec:.1f} t/s)")
+    
+    def _error_reply(self, e: Exception) -> str:
+        """Log a generation error and return the message shown to the user"""
+        logger.error(f"LM Studio generation error: {str(e)}")
+        
+        # Check if it's a connection error
+        if "Connection" in str(e) or "refused" in str(e):
+            return "Error: Cannot connect to LM Studio. Please ensure LM Studio is running with a model loaded."
+        return f"Error: {str(e)}"
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the current model and server"""
@@ -0,0 +1,91 @@
+"""
+Shared audio pipeline for the web servers
+Decodes browser recordings in memory, transcribes them, and confirms streamed words
+"""
+import subprocess
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000  # Whisper expects 16 kHz mono
+FFMPEG_PCM_OUTPUT = ['-f', 's16le', '-acodec', 'pcm_s16le', '-ar', str(SAMPLE_RATE), '-ac', '1', 'pipe:1']
+
+# Greedy decoding for the real-time paths: no beam search and no
+# temperature-fallback retries, which multiply decode cost on short clips
+REALTIME_DECODE_OPTIONS = {
+    'beam_size': 1,
+    'best_of': 1,
+    'temperature': 0.0,
+    'condition_on_previous_text': False,
+}
+
+
+def pcm16_to_float32(pcm_bytes):
+    """Convert 16-bit little-endian PCM bytes to a float32 array in [-1, 1]"""
+    return np.frombuffer(pcm_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _normalize_word(word):
+    """Compare words without case or punctuation"""
+    return word.strip().strip('.,!?;:"\'').lower()
+
+
+def agreed_prefix(previous_words, current_words):
+    """Length of the common prefix of two transcription passes (LocalAgreement-2)"""
+    count = 0
+    for prev, curr in zip(previous_words, current_words):
+        if _normalize_word(prev.word) != _normalize_word(curr.word):
+            break
+        count += 1
+    return count
+
+
+def decode_webm(audio_data):
+    """Decode a complete WebM recording to 16 kHz mono float32 PCM in memory"""
+    result = subprocess.run(
+        ['ffmpeg', '-loglevel', 'quiet', '-i', 'pipe:0', *FFMPEG_PCM_OUTPUT],
+        input=audio_data,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=True
+    )
+    return pcm16_to_float32(result.stdout)
+
+
+def process_audio_bytes(audio_bytes, emit, transcribe, respond, language):
+    """
+    Run one push-to-talk turn: decode, transcribe, then hand off for a response.
+
+    Args:
+        audio_bytes: WebM recording from the browser
+        emit: Callable(event, data) sending an event to the client
+        transcribe: Callable(audio, **kwargs) returning (segments, info)
+        respond: Callable(text) that streams the response and speaks it
+        language: Whisper language code
+
+    Returns:
+        The transcription, or None if no speech was detected
+    """
+    emit('status', {'message': 'Processing audio...', 'type': 'processing'})
+
+    # Decode WebM to PCM in memory
+    audio = decode_webm(audio_bytes)
+
+    emit('status', {'message': 'Transcribing...', 'type': 'transcribing'})
+
+    segments, info = transcribe(
+        audio,
+        language=language,
+        without_timestamps=True,
+        **REALTIME_DECODE_OPTIONS
+    )
+    transcription = " ".join(segment.text for segment in segments).strip()
+
+    if not transcription:
+        emit('error', {'message': 'No speech detected'})
+        return None
+
+    emit('transcription', {'text': transcription})
+    respond(transcription)
+    return transcription
@@ -1,10 +1,13 @@
 """
 Speech-to-Text module using Whisper
 """
+import os
 import time
-import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 import numpy as np
 import sounddevice as sd
+import ctranslate2
 from faster_whisper import WhisperModel
 import webrtcvad
 from typing import Optional, Callable
@@ -12,6 +15,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Longest VAD recording kept; older audio is overwritten by the ring buffer
+MAX_RECORDING_SECONDS = 120
+
 
 class WhisperSTT:
     """Speech-to-Text using OpenAI Whisper"""
@@ -20,8 +26,14 @@ class WhisperSTT:
         self.config = config
         self.model = None
         self.vad = None
-        self.audio_queue = queue.Queue()
         self.recording = False
+        # Recording ring buffer, filled by audio_callback; _write_pos counts samples written
+        self._ring = np.empty(0, dtype=np.float32)
+        self._write_pos = 0
+        self._audio_ready = threading.Event()
+        # Transcribes speech while VAD is still waiting out the trailing silence
+        self._stt_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='whisper')
+        self._early_transcription: Optional[Future] = None
         self.setup()
         
     def setup(self):
@@ -35,14 +47,20 @@ class WhisperSTT:
         if device == 'auto':
             device = 'auto'  # faster-whisper handles device selection
         
-        # Use int8 for Apple Silicon, float16 for CUDA
-        compute_type = self.config['whisper'].get('compute_type', 'int8')
+        # 'auto' picks int8 weights with float16 compute on CUDA, plain int8 elsewhere (CPU/Apple Silicon)
+        compute_type = self.config['whisper'].get('compute_type') or 'auto'
+        if compute_type == 'auto':
+            on_cuda = device == 'cuda' or (device == 'auto' and ctranslate2.get_cuda_device_count() > 0)
+            compute_type = 'int8_float16' if on_cuda else 'int8'
         
-        logger.info(f"Loading Whisper model '{model_name}'...")
+        logger.info(f"Loading Whisper model '{model_name}' ({compute_type})...")
         self.model = WhisperModel(
             model_name, 
             device=device,
             compute_type=compute_type,
+            # Half the cores leaves room for the LLM and audio threads
+            cpu_threads=self.config['whisper'].get('cpu_threads', max(1, (os.cpu_count() or 4) // 2)),
+            num_workers=self.config['whisper'].get('num_workers', 2),
             download_root="./models"
         )
         logger.info("Whisper model loaded successfully")
@@ -50,46 +68,95 @@ class WhisperSTT:
         # Initialize VAD if enabled
         if self.config['vad']['enabled']:
             self.vad = webrtcvad.Vad(self.config['vad']['mode'])
+            sample_rate = self.config['audio']['sample_rate']
+            self._vad_frame_size = int(sample_rate * 30 / 1000)  # 30 ms frames
+            # PCM conversion buffer, sized for one recording chunk
+            chunk_samples = int(sample_rate * self.config['audio']['chunk_duration'])
+            self._pcm_scratch = np.empty(chunk_samples, dtype=np.int16)
             logger.info("Voice Activity Detection initialized")
+        
+        # Pay the first-inference cost during startup rather than on the first utterance
+        self._warm = threading.Event()
+        threading.Thread(target=self._warmup, daemon=True).start()
+    
+    def _warmup(self):
+        """Run one throwaway transcription so kernels and buffers are ready"""
+        try:
+            start_time = time.time()
+            segments, _ = self.model.transcribe(
+                np.zeros(16000, dtype=np.float32),
+                language=self.config['whisper']['language'],
+                beam_size=1,
+                vad_filter=False
+            )
+            list(segments)  # segments are decoded lazily
+            logger.info(f"Whisper warmed up in {time.time() - start_time:.2f}s")
+        except Exception as e:
+            logger.warning(f"Whisper warmup failed: {e}")
+        finally:
+            self._warm.set()
     
     def audio_callback(self, indata, frames, time_info, status):
-        """Callback for audio stream"""
+        """Callback for audio stream; copies the first channel into the ring buffer"""
         if status:
             logger.warning(f"Audio callback status: {status}")
         
         if self.recording:
-            self.audio_queue.put(indata.copy())
+            ring = self._ring
+            start = self._write_pos % len(ring)
+            end = start + frames
+            if end <= len(ring):
+                ring[start:end] = indata[:, 0]
+            else:
+                split = len(ring) - start
+                ring[start:] = indata[:split, 0]
+                ring[:end - len(ring)] = indata[split:, 0]
+            self._write_pos += frames
+            self._audio_ready.set()
+    
+    def _ring_slice(self, start: int, length: int) -> np.ndarray:
+        """Samples [start, start + length) of the recording; a view unless it wraps"""
+        ring = self._ring
+        offset = start % len(ring)
+        if offset + length <= len(ring):
+            return ring[offset:offset + length]
+        return np.concatenate((ring[offset:], ring[:offset + length - len(ring)]))
     
     def detect_speech(self, audio_data: np.ndarray) -> bool:
         """Detect if audio contains speech using VAD"""
         if not self.vad or not self.config['vad']['enabled']:
             return True
         
-        # Convert to 16-bit PCM
-        audio_int16 = (audio_data * 32767).astype(np.int16)
-        
-        # VAD works with specific frame sizes (10, 20, or 30 ms)
+        # VAD works with specific frame sizes (10, 20, or 30 ms); only whole frames are checked
         sample_rate = self.config['audio']['sample_rate']
-        frame_duration_ms = 30
-        frame_size = int(sample_rate * frame_duration_ms / 1000)
+        frame_size = self._vad_frame_size
+        samples = audio_data.reshape(-1)
+        n = len(samples) - len(samples) % frame_size
+        if n == 0:
+            return False
         
-        # Process frames
-        speech_frames = 0
-        total_frames = 0
+        # Convert to 16-bit PCM in a reused buffer, split into one row per frame
+        if n > len(self._pcm_scratch):
+            self._pcm_scratch = np.empty(n, dtype=np.int16)
+        pcm = self._pcm_scratch[:n]
+        np.multiply(samples[:n], 32767, out=pcm, casting='unsafe')
+        frames = pcm.reshape(-1, frame_size)
         
-        for i in range(0, len(audio_int16) - frame_size, frame_size):
-            frame = audio_int16[i:i + frame_size].tobytes()
-            try:
-                if self.vad.is_speech(frame, sample_rate):
+        # Speech if more than 30% of frames contain it; stop once the outcome is settled
+        total_frames = len(frames)
+        needed = int(total_frames * 0.3) + 1
+        speech_frames = 0
+        try:
+            for i, frame in enumerate(frames):
+                if self.vad.is_speech(frame.tobytes(), sample_rate):
                     speech_frames += 1
-                total_frames += 1
-            except Exception:
-                continue
-        
-        # Return True if enough frames contain speech
-        if total_frames > 0:
-            speech_ratio = speech_frames / total_frames
-            return speech_ratio > 0.3
+                    if speech_frames >= needed:
+                        return True
+                elif speech_frames + (total_frames - i - 1) < needed:
+                    return False
+        except Exception as e:
+            # Raised for unsupported sample rates/frame sizes, so every frame would fail
+            logger.warning(f"VAD failed: {e}")
         
         return False
     
@@ -119,11 +186,15 @@ class WhisperSTT:
             sd.wait()
             return recording.flatten()
     
-    def _record_with_vad(self, vad_callback: Optional[Callable] = None) -> np.ndarray:
+    def _record_with_vad(self, vad_callback: Optional[Callable] = None,
+                         transcribe_early: bool = False) -> np.ndarray:
         """Record audio using Voice Activity Detection
 
         Args:
             vad_callback: Optional callback function for VAD events (listening, speech, silence)
+            transcribe_early: Start transcribing when silence begins, while the
+                speech timeout is still running; the result is left in
+                self._early_transcription if the utterance ends there
         """
         sample_rate = self.config['audio']['sample_rate']
         channels = self.config['audio']['channels']
@@ -133,6 +204,14 @@ class WhisperSTT:
         chunk_duration = self.config['audio']['chunk_duration']
         speech_timeout = self.config['vad']['speech_timeout']
         min_speech_duration = self.config['vad']['min_speech_duration']
+        block_size = int(sample_rate * chunk_duration)
+
+        # Ring buffer the audio callback writes into, a whole number of chunks long
+        capacity = max(MAX_RECORDING_SECONDS * sample_rate // block_size, 1) * block_size
+        if len(self._ring) != capacity:
+            self._ring = np.empty(capacity, dtype=np.float32)
+        self._write_pos = 0
+        self._audio_ready.clear()
 
         # Start audio stream
         stream = sd.InputStream(
@@ -140,13 +219,17 @@ class WhisperSTT:
             channels=channels,
             samplerate=sample_rate,
             device=device,
-            blocksize=int(sample_rate * chunk_duration)
+            blocksize=block_size
         )
 
-        audio_chunks = []
+        record_start = 0  # position the returned recording starts at
+        read_pos = 0      # position up to which chunks have been checked for speech
         speech_detected = False
         silence_start = None
         speech_start = None
+        finished = False
+        early = None  # transcription of the audio up to the current silence
+        self._early_transcription = None
 
         with stream:
             self.recording = True
@@ -156,59 +239,78 @@ class WhisperSTT:
             if vad_callback:
                 vad_callback('listening')
 
-            while True:
-                try:
-                    # Get audio chunk
-                    chunk = self.audio_queue.get(timeout=0.1)
-                    audio_chunks.append(chunk)
-
-                    # Check for speech
-                    if self.detect_speech(chunk):
-                        if not speech_detected:
-                            speech_detected = True
-                            speech_start = time.time()
-                            logger.info("Speech detected")
+            try:
+                while not finished:
+                    if not self._audio_ready.wait(timeout=0.1):
+                        continue
+                    self._audio_ready.clear()
 
-                            # Emit speech detected event
-                            if vad_callback:
-                                vad_callback('speech_detected')
-                        silence_start = None
-                    else:
-                        if speech_detected and silence_start is None:
-                            silence_start = time.time()
+                    # Check each newly recorded chunk in place
+                    while not finished and self._write_pos - read_pos >= block_size:
+                        chunk = self._ring_slice(read_pos, block_size)
+                        read_pos += block_size
 
-                            # Emit silence detected event
-                            if vad_callback:
-                                vad_callback('silence_detected')
+                        # Check for speech
+                        if self.detect_speech(chunk):
+                            if not speech_detected:
+                                speech_detected = True
+                                speech_start = time.time()
+                                logger.info("Speech detected")
 
-                    # Check stopping conditions
-                    if speech_detected and silence_start:
-                        silence_duration = time.time() - silence_start
-                        if silence_duration >= speech_timeout:
-                            speech_duration = time.time() - speech_start
-                            if speech_duration >= min_speech_duration:
-                                logger.info("Speech ended")
-                                break
-                            else:
-                                # Reset if speech was too short
-                                speech_detected = False
-                                silence_start = None
-                                speech_start = None
-                                audio_chunks = []
+                                # Emit speech detected event
+                                if vad_callback:
+                                    vad_callback('speech_detected')
+                            silence_start = None
+                            if early:
+                                # Speech resumed, so the early transcript is incomplete
+                                early.cancel()
+                                early = None
+                        else:
+                            if speech_detected and silence_start is None:
+                                silence_start = time.time()
+                                if transcribe_early:
+                                    early = self._stt_pool.submit(self.transcribe, np.array(
+                                        self._ring_slice(record_start, read_pos - record_start)))
 
-                                # Emit listening event (back to listening)
+                                # Emit silence detected event
                                 if vad_callback:
-                                    vad_callback('listening')
+                                    vad_callback('silence_detected')
 
-                except queue.Empty:
-                    continue
-                except KeyboardInterrupt:
-                    break
+                        # Check stopping conditions
+                        if speech_detected and silence_start:
+                            silence_duration = time.time() - silence_start
+                            if silence_duration >= speech_timeout:
+                                speech_duration = time.time() - speech_start
+                                if speech_duration >= min_speech_duration:
+                                    logger.info("Speech ended")
+                                    finished = True
+                                else:
+                                    # Reset if speech was too short
+                                    speech_detected = False
+                                    silence_start = None
+                                    speech_start = None
+                                    record_start = read_pos
+                                    if early:
+                                        early.cancel()
+                                        early = None
+
+                                    # Emit listening event (back to listening)
+                                    if vad_callback:
+                                        vad_callback('listening')
+
+            except KeyboardInterrupt:
+                pass
 
         self.recording = False
+        if finished:
+            self._early_transcription = early
+        elif early:
+            early.cancel()
 
-        if audio_chunks:
-            return np.concatenate(audio_chunks).flatten()
+        # Everything up to the last checked chunk, minus whatever the ring has overwritten
+        record_start = max(record_start, read_pos - capacity)
+        if read_pos > record_start:
+            return np.array(self._ring_slice(record_start, read_pos - record_start))
         return np.array([])
     
     def transcribe(self, audio: np.ndarray) -> str:
@@ -216,6 +318,8 @@ class WhisperSTT:
         if len(audio) == 0:
             return ""
         
+        # Let warmup finish rather than compete with it; don't wait forever
+        self._warm.wait(timeout=5)
         start_time = time.time()
         
         # Transcribe with faster-whisper
@@ -236,7 +340,14 @@ class WhisperSTT:
     def record_and_transcribe(self, duration: Optional[float] = None,
                              use_vad: bool = True) -> str:
         """Record audio and transcribe to text"""
-        audio = self.record_audio(duration, use_vad)
+        if use_vad and self.config['vad']['enabled']:
+            # The speech itself is usually transcribed while the trailing silence is timed
+            audio = self._record_with_vad(transcribe_early=True)
+            early, self._early_transcription = self._early_transcription, None
+            if early:
+                return early.result()
+        else:
+            audio = self.record_audio(duration, use_vad)
         if len(audio) > 0:
             return self.transcribe(audio)
         return ""
@@ -249,6 +360,7 @@ class PushToTalkSTT(WhisperSTT):
         super().__init__(config)
         self.ptt_key = key
         self.is_recording = False
+        self._ptt_buffer = np.empty(0, dtype=np.float32)
         
     def start_ptt_recording(self, callback: Callable[[str], None]):
         """Start push-to-talk recording with callback"""
@@ -262,26 +374,33 @@ class PushToTalkSTT(WhisperSTT):
             if not self.is_recording:
                 self.is_recording = True
                 logger.info(f"Push-to-talk: Recording started (holding {self.ptt_key})")
-                # Start recording in background
-                audio_chunks = []
-                
-                # Record while key is held
+                # Record while key is held, straight into one reusable buffer
                 sample_rate = self.config['audio']['sample_rate']
+                read_size = int(sample_rate * 0.1)
+                capacity = MAX_RECORDING_SECONDS * sample_rate
+                if len(self._ptt_buffer) != capacity:
+                    self._ptt_buffer = np.empty(capacity, dtype=np.float32)
+                buf = self._ptt_buffer
+                length = 0
                 stream = sd.InputStream(
                     samplerate=sample_rate,
                     channels=self.config['audio']['channels'],
-                    device=self.config['audio']['input_device']
+                    device=self.config['audio']['input_device'],
+                    dtype='float32'
                 )
                 
                 with stream:
                     while keyboard.is_pressed(self.ptt_key):
-                        chunk, _ = stream.read(int(sample_rate * 0.1))
-                        audio_chunks.append(chunk)
+                        if length + read_size > capacity:
+                            logger.warning(f"Push-to-talk: {MAX_RECORDING_SECONDS}s limit reached")
+                            break
+                        chunk, _ = stream.read(read_size)
+                        buf[length:length + len(chunk)] = chunk[:, 0]
+                        length += len(chunk)
                 
-                # Process audio
-                if audio_chunks:
-                    audio = np.concatenate(audio_chunks).flatten()
-                    text = self.transcribe(audio)
+                # Process audio (transcribed before the buffer is reused)
+                if length:
+                    text = self.transcribe(buf[:length])
                     if text:
                         callback(text)
                 
@@ -8,6 +8,7 @@ import logging
 from typing import Optional
 import pyttsx3
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor, CancelledError
 import queue
 import asyncio
 import edge_tts
@@ -23,6 +24,18 @@ class TTSEngine:
         """Convert text to speech"""
         raise NotImplementedError
     
+    def warmup(self):
+        """Load voice resources ahead of the first utterance"""
+        pass
+    
+    def synthesize(self, text: str) -> Optional[str]:
+        """Render text to an audio file for later playback, or None if unsupported"""
+        return None
+    
+    def play(self, audio_path: str):
+        """Play and delete an audio file produced by synthesize()"""
+        raise NotImplementedError
+    
     def stop(self):
         """Stop current speech"""
         pass
@@ -81,6 +94,50 @@ class MacOSTTS(TTSEngine):
         thread.daemon = True
         thread.start()
 
+    def synthesize(self, text: str) -> Optional[str]:
+        """Render text to an AIFF file with 'say -o'"""
+        fd, path = tempfile.mkstemp(suffix='.aiff')
+        os.close(fd)
+        cmd = ['say', '-o', path]
+        if self.voice:
+            cmd.extend(['-v', self.voice])
+        if self.rate:
+            cmd.extend(['-r', str(self.rate)])
+        cmd.append(self._clean_text(text))
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        except Exception:
+            os.unlink(path)
+            raise
+        return path
+
+    def play(self, audio_path: str):
+        """Play a rendered file with afplay, then delete it"""
+        try:
+            self.current_process = subprocess.Popen(
+                ['afplay', audio_path],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            self.current_process.wait()
+        finally:
+            os.unlink(audio_path)
+
+    def warmup(self):
+        """Render a short phrase to a scratch file so the voice is loaded before the first reply"""
+        fd, path = tempfile.mkstemp(suffix='.aiff')
+        os.close(fd)
+        try:
+            cmd = ['say', '-o', path]
+            if self.voice:
+                cmd.extend(['-v', self.voice])
+            cmd.append('Hi')
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        except Exception as e:
+            logger.debug(f"macOS TTS warmup failed: {e}")
+        finally:
+            os.unlink(path)
+
     def generate_audio_base64(self, text: str) -> Optional[str]:
         """Generate speech and return as base64-encoded audio data"""
         try:
@@ -379,6 +436,24 @@ class EdgeTTS(TTSEngine):
             logger.error(f"Edge TTS base64 generation error: {e}", exc_info=True)
             return None
     
+    def synthesize(self, text: str) -> Optional[str]:
+        """Render text to an MP3 file with edge-tts"""
+        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as tmp_file:
+            tmp_path = tmp_file.name
+        try:
+            asyncio.run(self._generate_speech(self._clean_text(text), tmp_path))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path
+    
+    def play(self, audio_path: str):
+        """Play a rendered file, then delete it"""
+        try:
+            self._play_audio(audio_path)
+        finally:
+            os.unlink(audio_path)
+    
     async def _generate_speech(self, text: str, output_path: str):
         """Generate speech using edge-tts async API"""
         communicate = edge_tts.Communicate(
@@ -460,11 +535,15 @@ class EdgeTTS(TTSEngine):
 class StreamingTTS:
     """TTS with streaming support for real-time synthesis"""
     
-    def __init__(self, engine: TTSEngine):
+    def __init__(self, engine: TTSEngine, synthesis_workers: int = 2):
         self.engine = engine
-        self.text_queue = queue.Queue()
+        self.text_queue = queue.Queue()  # (generation, text, synthesis future) in playback order
+        self.generation = 0  # Bumped by cancel(); sentences queued before it are dropped
         self.is_speaking = False
         self.worker_thread = None
+        self.buffer = ""
+        # Later sentences are synthesized while earlier ones play
+        self.synthesis_pool = ThreadPoolExecutor(max_workers=synthesis_workers)
         
     def start(self):
         """Start streaming TTS worker"""
@@ -473,54 +552,86 @@ class StreamingTTS:
         self.worker_thread.start()
     
     def _worker(self):
-        """Worker thread for streaming TTS"""
-        buffer = ""
-        
+        """Worker thread that plays synthesized sentences in order"""
         while True:
             try:
-                # Get text chunk
-                chunk = self.text_queue.get(timeout=0.1)
-                
-                if chunk is None:  # End signal
-                    if buffer:
-                        self.engine.speak(buffer)
-                        buffer = ""
-                    continue
-                
-                buffer += chunk
-                
-                # Speak on sentence boundaries
-                if any(char in chunk for char in '.!?'):
-                    if buffer.strip():
-                        self.is_speaking = True
-                        self.engine.speak(buffer)
-                        self.is_speaking = False
-                        buffer = ""
-                
+                generation, text, future = self.text_queue.get(timeout=0.1)
             except queue.Empty:
                 continue
+            
+            try:
+                audio_path = future.result()
+                # cancel() may have run while this sentence was still synthesizing
+                if generation != self.generation:
+                    _discard_audio(future)
+                    continue
+                self.is_speaking = True
+                if audio_path:
+                    self.engine.play(audio_path)
+                else:
+                    # Engine cannot pre-render; speak directly
+                    self.engine.speak(text)
+            except CancelledError:
+                pass
             except Exception as e:
                 logger.error(f"Streaming TTS error: {e}")
+            finally:
+                self.is_speaking = False
+    
+    def _enqueue(self, text: str):
+        """Start synthesizing text and queue it for playback"""
+        if text.strip():
+            future = self.synthesis_pool.submit(self.engine.synthesize, text)
+            self.text_queue.put((self.generation, text, future))
     
     def add_text(self, text: str):
         """Add text to speak queue"""
-        self.text_queue.put(text)
+        self.buffer += text
+        
+        # Speak on sentence boundaries
+        if any(char in text for char in '.!?'):
+            self._enqueue(self.buffer)
+            self.buffer = ""
+    
+    def speak_chunk(self, text: str):
+        """Queue text as is, for callers that choose the chunk boundaries themselves"""
+        self.flush()  # anything buffered by add_text goes first
+        self._enqueue(text)
     
     def flush(self):
         """Flush remaining text"""
-        self.text_queue.put(None)
+        self._enqueue(self.buffer)
+        self.buffer = ""
     
-    def stop(self):
-        """Stop speaking"""
-        # Clear queue
-        while not self.text_queue.empty():
+    def cancel(self):
+        """Drop queued sentences and stop current playback (barge-in)"""
+        self.buffer = ""
+        self.generation += 1
+        while True:
             try:
-                self.text_queue.get_nowait()
-            except Exception:
-                pass
+                _, _, future = self.text_queue.get_nowait()
+            except queue.Empty:
+                break
+            if not future.cancel():
+                future.add_done_callback(_discard_audio)
         
         # Stop engine
         self.engine.stop()
+    
+    def stop(self):
+        """Stop speaking"""
+        self.cancel()
+        self.synthesis_pool.shutdown(wait=False)
+
+
+def _discard_audio(future):
+    """Delete the file of a synthesis that finished after being dropped"""
+    try:
+        audio_path = future.result()
+    except Exception:
+        return
+    if audio_path:
+        os.unlink(audio_path)
 
 
 def create_tts_engine(config: dict) -> TTSEngine:
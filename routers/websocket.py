@@ -4,16 +4,33 @@ Handles real-time communication between client and server
 """
 import os
 import logging
-import base64
 import tempfile
 import asyncio
 import subprocess
 import numpy as np
+from binascii import a2b_base64
 from services.live_assistant_service import LiveAssistantService
 from modules.config_helper import save_config_to_file
 
 logger = logging.getLogger(__name__)
 
+# Keep short-lived audio files in RAM where a tmpfs is available
+TEMP_AUDIO_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def _write_temp_audio(audio_data, suffix='.webm'):
+    """Write audio bytes to a temporary file and return its path"""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=TEMP_AUDIO_DIR)
+    with os.fdopen(fd, 'wb') as tmp_file:
+        tmp_file.write(audio_data)
+    return path
+
+
+def _decode_audio_payload(payload):
+    """Decode a base64 audio payload, with or without a data: URL prefix"""
+    head, sep, tail = payload.partition(',')
+    return a2b_base64(tail if sep else head)
+
 
 def register_websocket_handlers(sio, config, stt, tts, chat_service, audio_service, model_service):
     """Register async WebSocket event handlers"""
@@ -59,12 +76,10 @@ def register_websocket_handlers(sio, config, stt, tts, chat_service, audio_servi
             await sio.emit('status', {'message': 'Processing audio...', 'type': 'processing'}, room=sid)
 
             # Decode base64 audio
-            audio_data = base64.b64decode(data['audio'].split(',')[1] if ',' in data['audio'] else data['audio'])
+            audio_data = _decode_audio_payload(data['audio'])
 
             # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as tmp_file:
-                tmp_file.write(audio_data)
-                tmp_path = tmp_file.name
+            tmp_path = _write_temp_audio(audio_data)
 
             # Transcribe (run in thread pool for blocking operation)
             await sio.emit('status', {'message': 'Transcribing...', 'type': 'transcribing'}, room=sid)
@@ -87,12 +102,13 @@ def register_websocket_handlers(sio, config, stt, tts, chat_service, audio_servi
             # Generate response
             await sio.emit('status', {'message': 'Generating response...', 'type': 'generating'}, room=sid)
 
-            response_text = ""
-            for chunk in _state['chat_service'].generate_response(transcription, stream=True):
-                response_text += chunk
+            parts = []
+            async for chunk in _state['chat_service'].agenerate_response(transcription, stream=True):
+                parts.append(chunk)
                 await sio.emit('response_chunk', {'text': chunk, 'model': _state['llm'].model}, room=sid)
 
             # Complete response with model info
+            response_text = "".join(parts)
             await sio.emit('response_complete', {'text': response_text, 'model': _state['llm'].model}, room=sid)
 
             # Generate TTS if enabled
@@ -142,12 +158,13 @@ def register_websocket_handlers(sio, config, stt, tts, chat_service, audio_servi
             # Generate response
             await sio.emit('status', {'message': 'Generating response...', 'type': 'generating'}, room=sid)
 
-            response_text = ""
-            for chunk in _state['chat_service'].generate_response(text, stream=True):
-                response_text += chunk
+            parts = []
+            async for chunk in _state['chat_service'].agenerate_response(text, stream=True):
+                parts.append(chunk)
                 await sio.emit('response_chunk', {'text': chunk, 'model': _state['llm'].model}, room=sid)
 
             # Complete response with model info
+            response_text = "".join(parts)
             await sio.emit('response_complete', {'text': response_text, 'model': _state['llm'].model}, room=sid)
 
             # Generate TTS if enabled
@@ -509,12 +526,10 @@ def register_websocket_handlers(sio, config, stt, tts, chat_service, audio_servi
             logger.debug(f"Received live audio chunk from {sid}")
 
             # Decode base64 audio
-            audio_data = base64.b64decode(data['audio'].split(',')[1] if ',' in data['audio'] else data['audio'])
+            audio_data = _decode_audio_payload(data['audio'])
 
             # Save to temporary WebM file
-            with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as tmp_webm:
-                tmp_webm.write(audio_data)
-                webm_path = tmp_webm.name
+            webm_path = _write_temp_audio(audio_data)
 
             # Convert WebM to WAV for better Whisper compatibility
             wav_path = webm_path.replace('.webm', '.wav')
@@ -585,7 +600,7 @@ def register_websocket_handlers(sio, config, stt, tts, chat_service, audio_servi
         try:
             # Decode base64 PCM data
             pcm_b64 = data['audio']
-            pcm_bytes = base64.b64decode(pcm_b64)
+            pcm_bytes = a2b_base64(pcm_b64)
 
             # Convert bytes to numpy Float32 array
             pcm_array = np.frombuffer(pcm_bytes, dtype=np.float32)
@@ -3,7 +3,7 @@ Chat service
 Handles LLM interactions and conversation management
 """
 import logging
-from typing import Generator
+from typing import Generator, AsyncGenerator
 
 logger = logging.getLogger(__name__)
 
@@ -42,11 +42,31 @@ class ChatService:
             logger.error(f"Error generating response: {e}")
             yield f"Error: {str(e)}"
 
+    async def agenerate_response(self, prompt: str, stream: bool = True) -> AsyncGenerator[str, None]:
+        """
+        Generate response from LLM without blocking the event loop
+
+        Args:
+            prompt: User prompt/message
+            stream: Whether to stream the response
+
+        Yields:
+            Response text chunks if streaming, full response otherwise
+        """
+        try:
+            logger.info(f"Generating response for: {prompt[:50]}...")
+
+            async for chunk in self.llm.agenerate(prompt, stream=stream):
+                yield chunk
+
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            yield f"Error: {str(e)}"
+
     def clear_conversation(self):
         """Clear conversation history"""
         try:
-            self.llm.conversation.messages.clear()
-            logger.info("Conversation cleared")
+            self.llm.conversation.clear()
         except Exception as e:
             logger.error(f"Error clearing conversation: {e}")
             raise
@@ -128,9 +128,7 @@ Keep it concise, practical, and conversational. Speak naturally as if advising a
 
         try:
             # Generate using existing chat service
-            response = ""
-            for chunk in self.chat_service.generate_response(prompt, stream=False):
-                response += chunk
+            response = "".join(self.chat_service.generate_response(prompt, stream=False))
 
             # Parse response
             topic, key_points = self._parse_insight_response(response)
@@ -25,6 +25,11 @@ class ModelService:
             Tuple of (model_list, current_model)
         """
         try:
+            # Listing for the user bypasses the shared model cache (LM Studio)
+            if hasattr(self.llm, 'refresh_models'):
+                model_list = self.llm.refresh_models()
+                current_model = self.llm.model
+                return model_list, current_model
             # Check if LLM has list_models method (for LM Studio, custom backends, etc.)
             if hasattr(self.llm, 'list_models'):
                 model_list = self.llm.list_models()
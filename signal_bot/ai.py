@@ -3,14 +3,25 @@ import os
 from typing import Tuple, List, Dict, Any
 from config import CONFIG, SHARED_PROMPTS, CONTEXT_WINDOW_SIZE
 from utils import run_command_on_host
+from response_cache import make_key, get_cached, store
 
-# For direct API calls
-from openai import OpenAI
-import google.generativeai as genai
+# For direct API calls; the SDKs themselves are imported on first use, since
+# loading them (google-generativeai pulls in gRPC and protobuf) slows bot startup
+# and most messages are answered by Claude
+import httpx
+genai = None
+
+OPENAI_MODEL = 'gpt-4o'
+GEMINI_MODEL = 'gemini-1.5-flash'  # Defaulting to flash for speed/cost
+
+# Signal messages arrive minutes apart, so keep idle connections (and their
+# TLS sessions) around far longer than httpx's 5 second default
+API_CONNECTION_LIMITS = httpx.Limits(max_keepalive_connections=20, keepalive_expiry=300)
 
 # Initialize clients (will be lazy-loaded in functions if needed)
 _openai_client = None
 _gemini_configured = False
+_gemini_models = {}  # system prompt -> GenerativeModel
 
 def get_openai_client():
     global _openai_client
@@ -19,20 +30,37 @@ def get_openai_client():
         if not api_key:
             logging.error("OPENAI_API_KEY not found in config")
             return None
-        _openai_client = OpenAI(api_key=api_key)
+        from openai import OpenAI, DefaultHttpxClient
+        _openai_client = OpenAI(
+            api_key=api_key,
+            base_url=CONFIG.get("OPENAI_BASE_URL") or None,
+            http_client=DefaultHttpxClient(limits=API_CONNECTION_LIMITS)
+        )
     return _openai_client
 
 def configure_gemini():
-    global _gemini_configured
+    global _gemini_configured, genai
     if not _gemini_configured:
         api_key = CONFIG.get("GEMINI_API_KEY")
         if not api_key:
             logging.error("GEMINI_API_KEY not found in config")
             return False
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         _gemini_configured = True
     return True
 
+def get_gemini_model(system_prompt: str):
+    """Shared Gemini model per system prompt, reused across calls"""
+    model = _gemini_models.get(system_prompt)
+    if model is None:
+        # As a system instruction the prompt is an identical prefix on every
+        # call, which Gemini can serve from its context cache
+        model = _gemini_models[system_prompt] = genai.GenerativeModel(
+            GEMINI_MODEL, system_instruction=system_prompt
+        )
+    return model
+
 def call_claude(user_text: str, mode: str, history: list = None) -> str:
     """Call Claude CLI via SSH with conversation history (remains for now)."""
 
@@ -67,22 +95,32 @@ def call_openai(user_text: str, mode: str, history: list = None) -> str:
 
     system_prompt = SHARED_PROMPTS.get(mode, SHARED_PROMPTS["ask"])
     
-    messages = [{"role": "system", "content": system_prompt}]
-    
-    if history:
-        for msg in history[-CONTEXT_WINDOW_SIZE:]:
-            role = "user" if msg["role"] == "user" else "assistant"
-            messages.append({"role": role, "content": msg["content"]})
-    
-    messages.append({"role": "user", "content": user_text})
+    # Built in one pass; only the (role, content) window is read from history
+    window = [
+        ("user" if msg["role"] == "user" else "assistant", msg["content"])
+        for msg in (history or [])[-CONTEXT_WINDOW_SIZE:]
+    ]
+    messages = [
+        {"role": "system", "content": system_prompt},
+        *({"role": role, "content": content} for role, content in window),
+        {"role": "user", "content": user_text},
+    ]
+
+    cache_key = make_key("openai", OPENAI_MODEL, system_prompt, window, user_text)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        logging.info("OpenAI reply served from cache")
+        return cached
 
     try:
         response = client.chat.completions.create(
-            model="gpt-4o",  # Defaulting to gpt-4o
+            model=OPENAI_MODEL,
             messages=messages,
             max_tokens=1000
         )
-        return response.choices[0].message.content
+        result = response.choices[0].message.content
+        store(cache_key, result)
+        return result
     except Exception as e:
         logging.error(f"OpenAI API error: {e}")
         return f"[Mode: {mode.upper()}]\nOpenAI Error: {str(e)}"
@@ -94,22 +132,24 @@ def call_gemini(user_text: str, mode: str, history: list = None) -> str:
 
     system_prompt = SHARED_PROMPTS.get(mode, SHARED_PROMPTS["ask"])
     
+    window = [
+        ("user" if msg["role"] == "user" else "model", msg["content"])
+        for msg in (history or [])[-CONTEXT_WINDOW_SIZE:]
+    ]
+    chat_history = [{"role": role, "parts": [content]} for role, content in window]
+
+    cache_key = make_key("gemini", GEMINI_MODEL, system_prompt, window, user_text)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        logging.info("Gemini reply served from cache")
+        return cached
+
     try:
-        model = genai.GenerativeModel('gemini-1.5-flash') # Defaulting to flash for speed/cost
-        
-        chat_history = []
-        if history:
-            for msg in history[-CONTEXT_WINDOW_SIZE:]:
-                role = "user" if msg["role"] == "user" else "model"
-                chat_history.append({"role": role, "parts": [msg["content"]]})
+        model = get_gemini_model(system_prompt)
         
         chat = model.start_chat(history=chat_history)
-        
-        # Combine system prompt with user text for now as Gemini 1.5-flash 
-        # handling of system instructions varies by sdk version.
-        full_user_text = f"{system_prompt}\n\nUser: {user_text}"
-        
-        response = chat.send_message(full_user_text)
+        response = chat.send_message(user_text)
+        store(cache_key, response.text)
         return response.text
 
     except Exception as e:
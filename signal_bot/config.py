@@ -34,6 +34,8 @@ CONFIG = {
 
     # AI API Keys
     "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", ""),
+    # Optional OpenAI-compatible endpoint, e.g. a batching proxy in front of the API
+    "OPENAI_BASE_URL": os.environ.get("OPENAI_BASE_URL", ""),
     "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", ""),
 }
 
@@ -42,6 +44,10 @@ CONTEXT_WINDOW_SIZE = 5  # Pass last 5 messages to AI
 # Preferences file location (persistent storage)
 PREFERENCES_FILE = "/app/user_preferences.json"
 
+# Cache of OpenAI/Gemini replies, keyed by the exact request (persistent storage)
+RESPONSE_CACHE_FILE = os.environ.get("RESPONSE_CACHE_FILE", "/app/ai_response_cache.db")
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 3600))  # seconds; 0 disables the cache
+
 # Shared system prompts for Claude and Gemini (DRY principle with mode safety)
 SHARED_PROMPTS = {
     "ask": """You are a helpful AI assistant in ASK mode (read-only with confirmation).
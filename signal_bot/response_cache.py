@@ -0,0 +1,59 @@
+import hashlib
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Optional
+from config import RESPONSE_CACHE_FILE, RESPONSE_CACHE_TTL
+
+_conn = None
+_lock = threading.Lock()
+
+def make_key(*parts) -> bytes:
+    """Hash of everything that determines a reply (provider, model, messages...)."""
+    return hashlib.blake2b(pickle.dumps(parts), digest_size=16).digest()
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(RESPONSE_CACHE_FILE, check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key BLOB PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+    return _conn
+
+def get_cached(key: bytes) -> Optional[str]:
+    """Return the cached reply for key, or None if missing or expired."""
+    if RESPONSE_CACHE_TTL <= 0:
+        return None
+    try:
+        with _lock:
+            row = _get_conn().execute(
+                "SELECT value FROM responses WHERE key = ? AND created > ?",
+                (key, time.time() - RESPONSE_CACHE_TTL)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logging.error(f"Response cache read error: {e}")
+        return None
+    return row[0] if row else None
+
+def store(key: bytes, value: str):
+    """Cache a reply; failures are logged and otherwise ignored."""
+    if RESPONSE_CACHE_TTL <= 0 or not value:
+        return
+    try:
+        with _lock:
+            conn = _get_conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                    (key, value, time.time())
+                )
+                conn.execute(
+                    "DELETE FROM responses WHERE created <= ?",
+                    (time.time() - RESPONSE_CACHE_TTL,)
+                )
+    except sqlite3.Error as e:
+        logging.error(f"Response cache write error: {e}")
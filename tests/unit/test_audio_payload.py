@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Unit tests for decoding base64 audio payloads from the browser
+"""
+import os
+import sys
+import base64
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from routers.websocket import _decode_audio_payload
+
+AUDIO = b'\x1aE\xdf\xa3 fake webm bytes \x00\xff'
+ENCODED = base64.b64encode(AUDIO).decode()
+
+
+def test_decode_plain_base64():
+    """Test that a bare base64 string is decoded"""
+    assert _decode_audio_payload(ENCODED) == AUDIO
+
+    print("✅ Plain base64 payload test passed")
+
+
+def test_decode_data_url():
+    """Test that a data: URL prefix is stripped before decoding"""
+    assert _decode_audio_payload(f"data:audio/webm;codecs=opus;base64,{ENCODED}") == AUDIO
+
+    print("✅ Data URL payload test passed")
+
+
+def test_decode_matches_b64decode():
+    """Test that decoding agrees with base64.b64decode on padded input"""
+    for size in range(1, 8):
+        data = bytes(range(size))
+        assert _decode_audio_payload(base64.b64encode(data).decode()) == base64.b64decode(base64.b64encode(data))
+
+    print("✅ base64 compatibility test passed")
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_decode_plain_base64()
+    test_decode_data_url()
+    test_decode_matches_b64decode()
+
+    print("\n🎉 All audio payload tests passed!")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Unit tests for conversation history trimming
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from modules.llm_base import ConversationManagerBase, estimate_tokens
+
+
+def test_trim_keeps_history_within_token_budget():
+    """Test that old messages are dropped once the token budget is exceeded"""
+    conversation = ConversationManagerBase(max_history=50, max_tokens=100)
+
+    for i in range(20):
+        conversation.add_message('user' if i % 2 == 0 else 'assistant', f"message {i} " + "x" * 60)
+        total = sum(m.tokens for m in conversation.messages)
+        assert total <= conversation.max_tokens
+        assert conversation.messages[-1].content.startswith(f"message {i} ")
+
+    # The newest messages are the ones kept
+    assert conversation.messages[0].content.startswith("message ")
+    assert len(conversation.messages) < 20
+
+    print("✅ Token budget trimming test passed")
+
+
+def test_trim_keeps_newest_message_over_budget():
+    """Test that a single message larger than the budget is still kept"""
+    conversation = ConversationManagerBase(max_history=50, max_tokens=20)
+    conversation.add_message('user', "short")
+    conversation.add_message('assistant', "y" * 400)
+
+    assert len(conversation.messages) == 1
+    assert conversation.messages[0].content == "y" * 400
+
+    print("✅ Oversized newest message test passed")
+
+
+def test_trim_respects_max_history():
+    """Test that the message count is capped at max_history pairs"""
+    conversation = ConversationManagerBase(max_history=2, max_tokens=10000)
+    for i in range(9):
+        conversation.add_message('user', f"message {i}")
+
+    assert [m.content for m in conversation.messages] == [f"message {i}" for i in range(5, 9)]
+    assert conversation.get_context() == [{"role": "user", "content": f"message {i}"} for i in range(5, 9)]
+
+    print("✅ Max history trimming test passed")
+
+
+def test_running_total_survives_reassignment_and_take_over():
+    """Test that the token total stays correct when history is replaced or moved"""
+    conversation = ConversationManagerBase(max_history=50, max_tokens=60)
+    conversation.add_message('user', "a" * 100)
+
+    # Replacing the history resets the total, so nothing stale triggers a trim
+    conversation.messages = []
+    conversation.add_message('user', "b" * 100)
+    conversation.add_message('assistant', "c" * 100)
+    assert [m.content for m in conversation.messages] == ["b" * 100, "c" * 100]
+
+    other = ConversationManagerBase(max_history=50, max_tokens=60)
+    other.take_over(conversation)
+    assert conversation.messages == []
+    other.add_message('user', "d" * 100)
+    assert [m.content for m in other.messages] == ["c" * 100, "d" * 100]
+    assert sum(m.tokens for m in other.messages) == 2 * estimate_tokens("d" * 100)
+
+    # The emptied conversation starts again from zero
+    conversation.add_message('user', "e" * 100)
+    conversation.add_message('assistant', "f" * 100)
+    assert len(conversation.messages) == 2
+
+    print("✅ Running token total test passed")
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_trim_keeps_history_within_token_budget()
+    test_trim_keeps_newest_message_over_budget()
+    test_trim_respects_max_history()
+    test_running_total_survives_reassignment_and_take_over()
+
+    print("\n🎉 All conversation trimming tests passed!")
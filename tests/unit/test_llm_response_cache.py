@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the LLM response cache
+"""
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from modules.llm import ResponseCache
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the least recently used entry is evicted when the cache is full"""
+    cache = ResponseCache(max_size=2)
+    cache.set('a', ("A",))
+    cache.set('b', ("B",))
+
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get('a') == ("A",)
+    cache.set('c', ("C",))
+
+    assert cache.get('b') is None
+    assert cache.get('a') == ("A",)
+    assert cache.get('c') == ("C",)
+    assert len(cache.cache) == 2
+
+    print("✅ LRU eviction test passed")
+
+
+def test_cache_overwrite_refreshes_entry():
+    """Test that setting an existing key replaces it and marks it recently used"""
+    cache = ResponseCache(max_size=2)
+    cache.set('a', ("A",))
+    cache.set('b', ("B",))
+    cache.set('a', ("A2",))
+    cache.set('c', ("C",))
+
+    assert cache.get('a') == ("A2",)
+    assert cache.get('b') is None
+
+    print("✅ Cache overwrite test passed")
+
+
+def test_cache_stats():
+    """Test that hits and misses are counted"""
+    cache = ResponseCache(max_size=2)
+    cache.set('a', ("A",))
+    cache.get('a')
+    cache.get('missing')
+
+    stats = cache.get_stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == "50.0%"
+
+    print("✅ Cache stats test passed")
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_cache_evicts_least_recently_used()
+    test_cache_overwrite_refreshes_entry()
+    test_cache_stats()
+
+    print("\n🎉 All LLM response cache tests passed!")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared audio pipeline helpers
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from modules.pipeline import agreed_prefix
+
+
+def words(*texts):
+    """Stand-ins for faster-whisper Word objects"""
+    return [SimpleNamespace(word=text) for text in texts]
+
+
+def test_agreed_prefix_stops_at_first_difference():
+    """Test that only the words both passes agree on are confirmed"""
+    previous = words(" Hello", " there", " general")
+    current = words(" Hello", " there", " General", " Kenobi")
+    assert agreed_prefix(previous, current) == 3
+
+    current = words(" Hello", " where", " general")
+    assert agreed_prefix(previous, current) == 1
+
+    print("✅ Agreed prefix test passed")
+
+
+def test_agreed_prefix_ignores_case_and_punctuation():
+    """Test that words differing only in case or punctuation still agree"""
+    previous = words(" so,", " What's", " up")
+    current = words(" So", " what's", " up?")
+    assert agreed_prefix(previous, current) == 3
+
+    print("✅ Agreed prefix normalization test passed")
+
+
+def test_agreed_prefix_empty_passes():
+    """Test that nothing is confirmed when either pass is empty"""
+    assert agreed_prefix([], words(" Hello")) == 0
+    assert agreed_prefix(words(" Hello"), []) == 0
+
+    print("✅ Agreed prefix empty pass test passed")
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_agreed_prefix_stops_at_first_difference()
+    test_agreed_prefix_ignores_case_and_punctuation()
+    test_agreed_prefix_empty_passes()
+
+    print("\n🎉 All pipeline tests passed!")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Signal bot's persistent response cache
+"""
+import os
+import sys
+import time
+import tempfile
+from contextlib import contextmanager
+from unittest.mock import patch
+
+# Add the Signal bot directory to path (its modules import each other by name)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'signal_bot'))
+
+import response_cache
+
+
+@contextmanager
+def temp_cache(ttl=3600, path=None):
+    """Point the cache at a fresh database file with the given TTL"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with patch.object(response_cache, 'RESPONSE_CACHE_FILE', path or os.path.join(tmp_dir, 'cache.db')), \
+                patch.object(response_cache, 'RESPONSE_CACHE_TTL', ttl), \
+                patch.object(response_cache, '_conn', None):
+            try:
+                yield
+            finally:
+                if response_cache._conn is not None:
+                    response_cache._conn.close()
+
+
+def test_cache_hit():
+    """Test that a stored reply is returned for the same key"""
+    key = response_cache.make_key('gemini', 'model-a', [{'role': 'user', 'content': 'hi'}])
+    with temp_cache():
+        assert response_cache.get_cached(key) is None
+        response_cache.store(key, "Hello!")
+        assert response_cache.get_cached(key) == "Hello!"
+
+        other = response_cache.make_key('gemini', 'model-b', [{'role': 'user', 'content': 'hi'}])
+        assert response_cache.get_cached(other) is None
+
+    print("✅ Response cache hit test passed")
+
+
+def test_cache_expiry():
+    """Test that replies older than RESPONSE_CACHE_TTL are not returned"""
+    key = response_cache.make_key('gemini', 'model-a', 'expiring')
+    with temp_cache(ttl=60):
+        response_cache.store(key, "Soon stale")
+        assert response_cache.get_cached(key) == "Soon stale"
+
+        later = time.time() + 61
+        with patch('response_cache.time.time', return_value=later):
+            assert response_cache.get_cached(key) is None
+
+            # The next write prunes the expired row
+            response_cache.store(response_cache.make_key('gemini', 'model-a', 'fresh'), "Fresh")
+            rows = response_cache._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            assert rows == 1
+
+    print("✅ Response cache expiry test passed")
+
+
+def test_zero_ttl_disables_cache():
+    """Test that RESPONSE_CACHE_TTL=0 neither stores nor returns replies"""
+    key = response_cache.make_key('gemini', 'model-a', 'disabled')
+    with temp_cache(ttl=0):
+        response_cache.store(key, "Never cached")
+        assert response_cache.get_cached(key) is None
+        # The database is not even opened
+        assert response_cache._conn is None
+
+    print("✅ Disabled response cache test passed")
+
+
+def test_unwritable_path_is_a_miss():
+    """Test that a database that cannot be opened degrades to cache misses"""
+    key = response_cache.make_key('gemini', 'model-a', 'unwritable')
+    with temp_cache(path=os.path.join(tempfile.gettempdir(), 'missing-dir', 'nested', 'cache.db')):
+        response_cache.store(key, "Lost")  # Logged, not raised
+        assert response_cache.get_cached(key) is None
+
+    print("✅ Unwritable response cache test passed")
+
+
+if __name__ == "__main__":
+    # Run all tests
+    test_cache_hit()
+    test_cache_expiry()
+    test_zero_ttl_disables_cache()
+    test_unwritable_path_is_a_miss()
+
+    print("\n🎉 All response cache tests passed!")
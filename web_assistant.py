@@ -28,6 +28,11 @@ from services.model_service import ModelService
 from services.chat_service import ChatService
 from services.audio_service import AudioService
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
@@ -160,12 +165,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create Socket.IO server
+
+class OrjsonSerializer:
+    """json-module stand-in for Socket.IO packets backed by orjson"""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    @staticmethod
+    def loads(data, **kwargs):
+        return orjson.loads(data)
+
+
+# Create Socket.IO server (event payloads are encoded with orjson when available)
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins=cors_origins if cors_origins != ["*"] else '*',
     logger=False,
-    engineio_logger=False
+    engineio_logger=False,
+    **({'json': OrjsonSerializer} if orjson else {})
 )
 app_state['sio'] = sio
 